@@ -1,9 +1,8 @@
 import sys
-from PyQt5.QtWidgets import QApplication
-from src.gui.bitcoin_analyzer_gui import BitcoinAnalyzerGUI
+import time
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = BitcoinAnalyzerGUI()
-    window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    started = time.perf_counter()
+    # Everything heavy (the analyzer, PyQt5) is imported by the mode that needs it
+    from src.cli import main
+    sys.exit(main(sys.argv[1:], started))
\ No newline at end of file
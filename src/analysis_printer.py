@@ -1,6 +1,17 @@
+from datetime import datetime
+from pytz import timezone
+from .recommendation_engine import TIMEFRAMES
+
+DEFAULT_TIMEZONE = 'America/Sao_Paulo'
+
 class AnalysisPrinter:
     @staticmethod
-    def format_analysis_results(results):
+    def format_timestamp(epoch_ms, display_timezone=DEFAULT_TIMEZONE):
+        moment = datetime.fromtimestamp(epoch_ms / 1000, timezone(display_timezone))
+        return f"{moment.strftime('%Y-%m-%d %H:%M:%S')} {display_timezone} (UTC{moment.strftime('%z')})"
+
+    @staticmethod
+    def format_analysis_results(results, display_timezone=DEFAULT_TIMEZONE):
         formatted_text = "Bitcoin Analysis Results\n"
         formatted_text += "=" * 30 + "\n\n"
         
@@ -9,7 +20,7 @@ class AnalysisPrinter:
         formatted_text += f"Daily High (USD): ${results['high_price']:.2f}\n"
         formatted_text += f"Daily Low (USD): ${results['low_price']:.2f}\n"
         formatted_text += f"Predicted BTC Price (USD): ${results['predicted_price']:.2f}\n"
-        formatted_text += f"Last data timestamp: {results['last_timestamp']} Sao Paulo UTC -3\n\n"
+        formatted_text += f"Last data timestamp: {AnalysisPrinter.format_timestamp(results['last_timestamp'], display_timezone)}\n\n"
         
         formatted_text += f"Volume MA (8 days, USD): ${results['volume_ma'][-1]:.2f}b\n"
         formatted_text += f"Percentage Change (8 days): {results['percentage_change']:.2f}%\n"
@@ -38,7 +49,7 @@ class AnalysisPrinter:
         for name, value in zip(pivot_names, results['pivot_points']):
             formatted_text += f"{name}: ${value:.2f}\n"
         
-        for timeframe in ['real-time', 'daily', 'weekly', 'monthly']:
+        for timeframe in TIMEFRAMES:
             formatted_text += f"\n{timeframe.capitalize()} Recommendation:\n"
             formatted_text += f"{results[f'{timeframe}_recommendation']}\n"
         
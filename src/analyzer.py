@@ -1,65 +1,107 @@
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 from .data_fetcher import DataFetcher
 from .indicators import Indicators
-from .recommendation_engine import RecommendationEngine
+from .indicator_graph import IndicatorGraph
+from .recommendation_engine import RecommendationEngine, BAR_RESOLUTIONS, TIMEFRAMES
+from .metrics import metrics
 import logging
 
 class BitcoinAnalyzer:
-    def __init__(self):
-        self.data_fetcher = DataFetcher()
+    INDICATORS = ['volume_ma', 'volatility', 'rsi', 'percentage_change', 'predicted_price', 'bollinger_bands',
+                  'ema', 'fib_levels', 'macd', 'adx', 'stochastic', 'ichimoku_cloud', 'pivot_points']
+
+    def __init__(self, data_fetcher: Optional[DataFetcher] = None):
+        self.data_fetcher = data_fetcher or DataFetcher()
         self.indicators = Indicators()
+        self.indicator_graph = IndicatorGraph(self.indicators)
         self.recommendation_engine = RecommendationEngine()
 
-    def run_analysis(self) -> Optional[Dict[str, Any]]:
-        real_time_price = self.data_fetcher.fetch_real_time_price()
+    def close(self):
+        # Stops the worker threads of the indicator graph and the data fetcher
+        self.indicator_graph.close()
+        close_fetcher = getattr(self.data_fetcher, 'close', None)
+        if close_fetcher is not None:
+            close_fetcher()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def run_analysis(self, progress: Optional[Callable[[str], None]] = None,
+                     cancelled: Optional[Callable[[], bool]] = None) -> Optional[Dict[str, Any]]:
+        # progress receives a short message as each stage starts; cancelled is polled
+        # between stages and stops the run (returning None) once it returns True.
+        progress = progress or (lambda message: None)
+        cancelled = cancelled or (lambda: False)
+
+        progress("Fetching market data...")
+        with metrics.timer('stage_seconds', stage='fetch'):
+            real_time_price, historical = self.data_fetcher.fetch_all()
         if not real_time_price:
             logging.error("Failed to fetch real-time price. Aborting analysis.")
+            metrics.increment('analysis_runs_total', result='failed')
             return None
 
-        if not self.data_fetcher.fetch_historical_data():
+        if not historical:
             logging.error("Failed to fetch historical data. Aborting analysis.")
+            metrics.increment('analysis_runs_total', result='failed')
+            return None
+
+        if cancelled():
+            metrics.increment('analysis_runs_total', result='cancelled')
             return None
 
-        self.indicators.set_data(self.data_fetcher.prices, self.data_fetcher.volumes)
+        with metrics.timer('stage_seconds', stage='prepare'):
+            dataset = self.data_fetcher.dataset
+            self.indicators.set_data(dataset.close, dataset.volume)
 
         # Calculate indicators
-        analysis_results = self._calculate_indicators(real_time_price)
+        progress("Calculating indicators...")
+        with metrics.timer('stage_seconds', stage='indicators'):
+            analysis_results = self._calculate_indicators(real_time_price)
+        if cancelled():
+            metrics.increment('analysis_runs_total', result='cancelled')
+            return None
 
         # Get recommendations
-        analysis_results.update(self._get_recommendations(analysis_results))
+        progress("Generating recommendations...")
+        with metrics.timer('stage_seconds', stage='recommendations'):
+            analysis_results.update(self._get_recommendations(analysis_results))
 
+        metrics.increment('analysis_runs_total', result='ok')
         return analysis_results
 
     def _calculate_indicators(self, real_time_price: float) -> Dict[str, Any]:
-        return {
+        dataset = self.data_fetcher.dataset
+        results = {
             'real_time_price': real_time_price,
-            'opening_price': self.data_fetcher.prices[-1],
-            'volume_ma': self.indicators.calculate_volume_ma(),
-            'volatility': self.indicators.calculate_volatility(),
-            'rsi': self.indicators.calculate_rsi(),
-            'percentage_change': self.indicators.calculate_percentage_change(),
-            'predicted_price': self.indicators.calculate_linear_regression(),
-            'bollinger_bands': self.indicators.calculate_bollinger_bands(),
-            'ema': self.indicators.calculate_ema(),
-            'fib_levels': self.indicators.calculate_fibonacci_levels(),
-            'macd': self.indicators.calculate_macd(),
-            'adx': self.indicators.calculate_adx(),
-            'stochastic': self.indicators.calculate_stochastic(),
-            'ichimoku_cloud': self.indicators.calculate_ichimoku_cloud(),
-            'pivot_points': self.indicators.calculate_pivot_points(),
+            'opening_price': dataset.close[-1]
+        }
+        results.update(self.indicator_graph.compute(self.INDICATORS))
+        results.update({
             'high_price': self.data_fetcher.high_price,
             'low_price': self.data_fetcher.low_price,
-            'last_timestamp': self.data_fetcher.dates[-1],
-            'prices': self.data_fetcher.prices,
-            'volumes': self.data_fetcher.volumes
-        }
+            'last_timestamp': int(dataset.timestamp[-1]),
+            # Copies, so results handed out stay as they are whatever the fetcher loads next
+            'prices': dataset.close.copy(),
+            'volumes': dataset.volume.copy(),
+            'bars': {resolution: self.data_fetcher.bars(resolution) for resolution in BAR_RESOLUTIONS}
+        })
+        return results
+
+    def _get_recommendations(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return get_recommendations(self.recommendation_engine, data)
+
 
-    def _get_recommendations(self, data: Dict[str, Any]) -> Dict[str, str]:
-        recommendations = {}
-        for timeframe in ['real-time', 'daily', 'weekly', 'monthly']:
-            recommendations[f'{timeframe}_recommendation'] = self.recommendation_engine.get_recommendation(
-                data['opening_price'], data['rsi'], *data['macd'], data['fib_levels'],
-                *data['ichimoku_cloud'][2:4], data['ema'], *data['adx'], data['stochastic'],
-                *data['bollinger_bands'], timeframe, data['prices'], data['volumes'], data['pivot_points']
-            )
-        return recommendations
\ No newline at end of file
+def get_recommendations(recommendation_engine: RecommendationEngine, data: Dict[str, Any]) -> Dict[str, Any]:
+    # Shared with BatchAnalyzer, which feeds it one asset's slice of a batch result
+    details = recommendation_engine.get_recommendations(
+        data['opening_price'], data['rsi'], *data['macd'], data['fib_levels'],
+        *data['ichimoku_cloud'][2:4], data['ema'], *data['adx'], data['stochastic'],
+        *data['bollinger_bands'], TIMEFRAMES, data['prices'], data['volumes'], data['pivot_points'], data.get('bars')
+    )
+    recommendations = {f'{timeframe}_recommendation': result['recommendation'] for timeframe, result in details.items()}
+    recommendations['recommendation_details'] = details
+    return recommendations
@@ -0,0 +1,134 @@
+from typing import Any, Dict, Optional
+import numpy as np
+from .indicators import Indicators
+from .recommendation_engine import RecommendationEngine
+
+
+class Backtester:
+    # Replays the RecommendationEngine's buy/sell scoring over a whole price history.
+    # Every indicator is computed once as a full series, the score of every bar comes
+    # from one vectorized pass, and a position is opened on the close of any flat bar
+    # whose buy share reaches entry_threshold (the engine's "moderate buy" or better).
+    # It is closed on the first later close at or beyond the profit target or stop
+    # loss, or on the last bar. Closes are the only prices available, so exits fill at
+    # the close that crosses the level rather than at the level itself.
+    def __init__(self, profit_target: Optional[float] = None, stop_loss: Optional[float] = None,
+                 entry_threshold: float = 60, recommendation_engine: Optional[RecommendationEngine] = None):
+        self.recommendation_engine = recommendation_engine or RecommendationEngine()
+        self.profit_target = self.recommendation_engine.PROFIT_TARGET if profit_target is None else profit_target
+        self.stop_loss = self.recommendation_engine.STOP_LOSS if stop_loss is None else stop_loss
+        self.entry_threshold = entry_threshold  # Buy signals as a percentage of all signals
+
+    def run(self, prices, volumes=None) -> Dict[str, Any]:
+        prices = np.asarray(prices, dtype=float)
+        start, buy_signals, sell_signals = self.signal_series(prices, volumes)
+        entries = self.entries(buy_signals, sell_signals, self.entry_threshold)
+        trades = self._simulate(prices, start + np.flatnonzero(entries))
+        return self._report(prices, trades, start, buy_signals, sell_signals)
+
+    @staticmethod
+    def entries(buy_signals, sell_signals, entry_threshold):
+        # Bars whose buy share reaches entry_threshold percent
+        total = buy_signals + sell_signals
+        return (total > 0) & (buy_signals * 100 >= entry_threshold * total)
+
+    def signal_series(self, prices, volumes=None):
+        # Returns (first scored bar, buy scores, sell scores) with the scores covering
+        # bars start..len(prices)-1. Every input is causal, so the score of a bar is
+        # what get_recommendation would have seen with the history up to that bar.
+        indicators = Indicators()
+        indicators.set_data(prices, np.zeros_like(prices) if volumes is None else volumes)
+        macd, signal_macd = indicators.calculate_macd()
+        adx, plus_di, minus_di = indicators.calculate_adx_series()
+        upper_band, lower_band = indicators.calculate_bollinger_band_series()
+        series = [
+            indicators.prices, indicators.calculate_rsi(), macd, signal_macd,
+            *indicators.calculate_fibonacci_level_series(), *indicators.calculate_ichimoku_cloud_series()[2:4],
+            indicators.calculate_ema(), adx, plus_di, minus_di, indicators.calculate_stochastic_series(),
+            upper_band, lower_band
+        ]
+        # The ADX's first bar wraps around to the end of the data (np.roll), so it is skipped
+        length = min(len(values) for values in series) - 1
+        price, rsi, macd, signal_macd, fib_0, fib_1, fib_2, span_a, span_b, ema, adx, plus_di, minus_di, \
+            stochastic, upper_band, lower_band = [values[-length:] for values in series]
+        buy_signals, sell_signals = self.recommendation_engine.calculate_signal_series(
+            price, rsi, macd, signal_macd, (fib_0, fib_1, fib_2), span_a, span_b, ema,
+            adx, plus_di, minus_di, stochastic, upper_band, lower_band)
+        return len(prices) - length, buy_signals, sell_signals
+
+    def _simulate(self, prices, candidates):
+        # Positions never overlap, so the walk jumps from each exit straight to the next
+        # entry candidate. A signal on the last bar has no later close to trade on.
+        trades = []
+        n = len(prices)
+        candidates = candidates[candidates < n - 1]
+        i = 0
+        while i < len(candidates):
+            entry = candidates[i]
+            exit_index, reason = self._find_exit(prices, entry)
+            trades.append((entry, exit_index, reason))
+            if exit_index >= n - 1:
+                break
+            i = np.searchsorted(candidates, exit_index, side='right')
+        return trades
+
+    def _find_exit(self, prices, entry):
+        # Each trade scans only its own bars, in doubling chunks, which keeps the whole
+        # simulation linear in the number of bars
+        n = len(prices)
+        entry_price = prices[entry]
+        upper = entry_price * (1 + self.profit_target)
+        lower = entry_price * (1 - self.stop_loss)
+        begin, chunk = entry + 1, 64
+        while begin < n:
+            window = prices[begin:begin + chunk]
+            hit = np.flatnonzero((window >= upper) | (window <= lower))
+            if len(hit):
+                exit_index = begin + hit[0]
+                return exit_index, 'profit target' if prices[exit_index] >= upper else 'stop loss'
+            begin += chunk
+            chunk *= 2
+        return n - 1, 'end of data'
+
+    def _report(self, prices, trades, start, buy_signals, sell_signals):
+        performance = self.performance(prices, trades)
+        return {
+            'trades': [
+                {'entry_index': int(entry), 'exit_index': int(exit_index), 'entry_price': float(prices[entry]),
+                 'exit_price': float(prices[exit_index]), 'return': float(trade_return), 'exit_reason': reason}
+                for (entry, exit_index, reason), trade_return in zip(trades, performance['trade_returns'])
+            ],
+            'pnl': performance['pnl'],
+            'hit_rate': performance['hit_rate'],
+            'max_drawdown': performance['max_drawdown'],
+            'equity': performance['equity'],
+            'first_signal_index': start,
+            'buy_signals': buy_signals,
+            'sell_signals': sell_signals
+        }
+
+    @staticmethod
+    def performance(prices, trades):
+        # Equity is marked to market on every close; a trade holds from the close after
+        # its entry through its exit close.
+        holding = np.zeros(len(prices), dtype=np.int8)
+        for entry, exit_index, _ in trades:
+            if entry + 1 >= len(prices):
+                continue
+            holding[entry + 1] += 1
+            if exit_index + 1 < len(prices):
+                holding[exit_index + 1] -= 1
+        holding = np.cumsum(holding, dtype=np.int8).astype(bool)
+        returns = np.zeros(len(prices))
+        returns[1:] = np.where(holding[1:], prices[1:] / prices[:-1] - 1, 0.)
+        equity = np.cumprod(1 + returns)
+        drawdown = 1 - equity / np.maximum.accumulate(equity)
+
+        trade_returns = np.array([prices[exit_index] / prices[entry] - 1 for entry, exit_index, _ in trades])
+        return {
+            'pnl': float(equity[-1] - 1),
+            'hit_rate': float(np.mean(trade_returns > 0)) if len(trades) else 0.,
+            'max_drawdown': float(drawdown.max()),
+            'equity': equity,
+            'trade_returns': trade_returns
+        }
@@ -0,0 +1,172 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import requests
+from .analyzer import BitcoinAnalyzer, get_recommendations
+from .data_fetcher import DataFetcher, DAY_MS, DEFAULT_STORE_DIR
+from .indicators import Indicators
+from .indicator_graph import IndicatorGraph
+from .recommendation_engine import RecommendationEngine, BAR_RESOLUTIONS
+from .resampling import resample
+from .request_scheduler import shared_scheduler
+
+# simple/price takes a comma-separated id list; keep each URL well under length limits
+PRICE_IDS_PER_REQUEST = 250
+
+
+def _compute_indicators(prices, volumes, names):
+    # Module level so a ProcessPoolExecutor can pickle it
+    indicators = Indicators()
+    indicators.set_data(prices, volumes)
+    return IndicatorGraph(indicators, max_workers=1).compute(names)
+
+
+def _take(value, row):
+    # One asset's slice of a batch result, keeping the shape of the per-asset result
+    if isinstance(value, dict):
+        return {key: _take(item, row) for key, item in value.items()}
+    if isinstance(value, (tuple, list)):
+        return type(value)(_take(item, row) for item in value)
+    if isinstance(value, np.ndarray) and value.ndim:
+        return value[row]
+    return value
+
+
+class BatchAnalyzer:
+    # Scans a universe of coins in one go: histories are fetched concurrently through
+    # the shared RequestScheduler, aligned on a common time index, and every indicator
+    # is computed over the (assets x time) matrix in a single vectorized pass. Very
+    # large universes are split into row chunks that run on a process pool.
+    def __init__(self, coin_ids: Iterable[str], store_dir: Optional[str] = DEFAULT_STORE_DIR, scheduler=None,
+                 resolution_ms: int = DAY_MS, min_history: int = 60, fetch_workers: int = 8,
+                 process_chunk: int = 500, max_processes: Optional[int] = None, base_url: Optional[str] = None):
+        self.coin_ids = list(dict.fromkeys(coin_ids))
+        self.scheduler = scheduler or shared_scheduler()
+        self.resolution_ms = resolution_ms
+        self.min_history = min_history  # Buckets a coin needs to take part in a scan
+        self.fetch_workers = fetch_workers
+        self.process_chunk = process_chunk  # Assets per process-pool task; None disables the pool
+        self.max_processes = max_processes
+        self.fetchers = {coin_id: DataFetcher(coin_id, store_dir, self.scheduler, base_url) for coin_id in self.coin_ids}
+        self.recommendation_engine = RecommendationEngine()
+        self.skipped = {}  # coin_id -> reason, for the latest scan
+
+    def run_analysis(self, names: Optional[List[str]] = None, recommendations: bool = False) -> Dict[str, Dict[str, Any]]:
+        names = names or BitcoinAnalyzer.INDICATORS
+        self.skipped = {}
+        real_time_prices = self.fetch_real_time_prices()
+        series = self.fetch_histories()
+        coin_ids, timestamps, prices, volumes = self.align(series)
+        if not coin_ids:
+            logging.error("No coin has enough history for a batch analysis.")
+            return {}
+
+        bars = {}
+        if recommendations:
+            # Every coin's weekly/monthly bars in one pass over the aligned matrix
+            matrix = {'timestamp': timestamps, 'price': prices, 'volume': volumes}
+            bars = {resolution: resample(matrix, resolution) for resolution in BAR_RESOLUTIONS}
+
+        results = {}
+        for rows, batch in self._compute(coin_ids, prices, volumes, names):
+            for row, coin_id in rows:
+                result = {
+                    'real_time_price': real_time_prices.get(coin_id),
+                    'opening_price': prices[row, -1]
+                }
+                result.update(_take(batch, row - rows[0][0]))
+                result.update({
+                    'last_timestamp': int(series[coin_id]['timestamp'][-1]),
+                    'prices': prices[row],
+                    'volumes': volumes[row]
+                })
+                if recommendations:
+                    result['bars'] = {resolution: {name: column[row] if column.ndim == 2 else column
+                                                   for name, column in resolution_bars.items()}
+                                      for resolution, resolution_bars in bars.items()}
+                    result.update(get_recommendations(self.recommendation_engine, result))
+                results[coin_id] = result
+        return results
+
+    def fetch_real_time_prices(self) -> Dict[str, float]:
+        # One simple/price request quotes a whole chunk of the universe
+        if not self.coin_ids:
+            return {}
+        fetcher = self.fetchers[self.coin_ids[0]]
+        url, currency = f"{fetcher.base_url}/simple/price", fetcher.currency
+        futures = [
+            self.scheduler.submit(url, {"ids": ",".join(self.coin_ids[i:i + PRICE_IDS_PER_REQUEST]), "vs_currencies": currency})
+            for i in range(0, len(self.coin_ids), PRICE_IDS_PER_REQUEST)
+        ]
+        prices = {}
+        for future in futures:
+            try:
+                quotes = future.result()
+            except requests.RequestException as e:
+                print(f"Error fetching real-time prices: {e}")
+                continue
+            prices.update({coin_id: quote[currency] for coin_id, quote in quotes.items() if currency in quote})
+        return prices
+
+    def fetch_histories(self) -> Dict[str, Dict[str, np.ndarray]]:
+        # The scheduler enforces the rate limit; the threads only keep its queue full
+        def fetch(fetcher):
+            if not fetcher.fetch_historical_data(include_high_low=False):
+                return None
+            return {'timestamp': fetcher.timestamps, 'price': np.asarray(fetcher.prices, dtype=float),
+                    'volume': np.asarray(fetcher.volumes, dtype=float)}
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='batch-fetch') as executor:
+            fetched = dict(zip(self.coin_ids, executor.map(fetch, self.fetchers.values())))
+        series = {}
+        for coin_id, data in fetched.items():
+            if data is None or not len(data['timestamp']):
+                self.skipped[coin_id] = "no history"
+            else:
+                series[coin_id] = data
+        return series
+
+    def align(self, series: Dict[str, Dict[str, np.ndarray]]):
+        # Each coin keeps its last point per resolution bucket; the common index is
+        # every bucket from the youngest coin's first one on, and a coin missing a
+        # bucket carries its previous point forward (volumes are rolling 24h totals,
+        # so they carry forward just like prices).
+        bucketed = {}
+        for coin_id, data in series.items():
+            buckets = data['timestamp'] // self.resolution_ms
+            last = np.append(buckets[1:] != buckets[:-1], True)
+            if last.sum() < self.min_history:
+                self.skipped[coin_id] = f"only {last.sum()} points of history"
+                continue
+            bucketed[coin_id] = (buckets[last], data['price'][last], data['volume'][last])
+        if not bucketed:
+            return [], np.empty(0, dtype=np.int64), np.empty((0, 0)), np.empty((0, 0))
+
+        first = max(buckets[0] for buckets, _, _ in bucketed.values())
+        index = np.unique(np.concatenate([buckets for buckets, _, _ in bucketed.values()]))
+        index = index[index >= first]
+        coin_ids = list(bucketed)
+        prices = np.empty((len(coin_ids), len(index)))
+        volumes = np.empty((len(coin_ids), len(index)))
+        for row, coin_id in enumerate(coin_ids):
+            buckets, price, volume = bucketed[coin_id]
+            position = np.searchsorted(buckets, index, side='right') - 1
+            prices[row] = price[position]
+            volumes[row] = volume[position]
+        return coin_ids, index * self.resolution_ms, prices, volumes
+
+    def _compute(self, coin_ids, prices, volumes, names):
+        # Yields ([(row, coin_id), ...], batch result) per chunk of rows
+        rows = list(enumerate(coin_ids))
+        if not self.process_chunk or len(rows) <= self.process_chunk:
+            yield rows, _compute_indicators(prices, volumes, names)
+            return
+        chunks = [rows[i:i + self.process_chunk] for i in range(0, len(rows), self.process_chunk)]
+        workers = min(len(chunks), self.max_processes or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_compute_indicators, prices[chunk[0][0]:chunk[-1][0] + 1],
+                                       volumes[chunk[0][0]:chunk[-1][0] + 1], names) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                yield chunk, future.result()
@@ -0,0 +1,191 @@
+import argparse
+import gc
+import inspect
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime, timezone
+import numpy as np
+from .analyzer import BitcoinAnalyzer
+from .data_fetcher import DAY_MS
+from .dataset import OHLCVDataset
+from .indicators import Indicators
+from .recommendation_engine import RecommendationEngine, TIMEFRAMES
+from .resampling import resample
+
+# Offline benchmarks for the indicator, recommendation and full-analysis code paths.
+#
+#   python -m src.benchmark --output results.json
+#   python -m src.benchmark --baseline results.json --max-slowdown 0.25
+#
+# Every case runs on seeded synthetic data, is timed as the best of --repeat runs
+# on fresh state (so Indicators' memoization never hides the work), and is run
+# once more under tracemalloc for its peak memory. With --baseline, any case more
+# than --max-slowdown slower than its saved time fails the run.
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def synthetic_series(size, seed=42):
+    # Geometric random walk around BTC-like prices, with log-normal daily volumes
+    rng = np.random.default_rng(seed)
+    prices = 30000 * np.exp(np.cumsum(rng.normal(0, 0.02, size)))
+    volumes = rng.lognormal(np.log(3e10), 0.3, size)
+    return prices, volumes
+
+
+class StubFetcher:
+    # Stands in for DataFetcher: serves the synthetic series without any I/O
+    def __init__(self, prices, volumes):
+        self.dataset = OHLCVDataset(np.arange(len(prices), dtype=np.int64) * DAY_MS, prices, volume=volumes)
+        self.high_price = float(prices[-1] * 1.02)
+        self.low_price = float(prices[-1] * 0.98)
+
+    def fetch_all(self):
+        return float(self.dataset.close[-1]), True
+
+    def bars(self, resolution):
+        return resample(self.dataset, resolution)
+
+
+def indicator_methods():
+    return [name for name, _ in inspect.getmembers(Indicators, inspect.isfunction) if name.startswith('calculate_')]
+
+
+def benchmark_cases(prices, volumes):
+    # name -> (setup, run): setup builds fresh state outside the timed region
+    def fresh_indicators():
+        indicators = Indicators()
+        indicators.set_data(prices, volumes)
+        return indicators
+
+    cases = {}
+    for method in indicator_methods():
+        cases[f'indicators.{method}'] = (fresh_indicators, lambda indicators, method=method: getattr(indicators, method)())
+
+    def recommendation_inputs():
+        indicators = fresh_indicators()
+        macd, signal_macd = indicators.calculate_macd()
+        signals = (prices[-1], indicators.calculate_rsi(), macd, signal_macd, indicators.calculate_fibonacci_levels(),
+                   *indicators.calculate_ichimoku_cloud()[2:4], indicators.calculate_ema(), *indicators.calculate_adx(),
+                   indicators.calculate_stochastic(), *indicators.calculate_bollinger_bands())
+        return signals, indicators.calculate_pivot_points()
+
+    engine = RecommendationEngine()
+    history = (prices, volumes)
+    cases['recommendation.get_recommendation'] = (recommendation_inputs, lambda inputs: engine.get_recommendation(
+        *inputs[0], 'daily', *history, inputs[1]))
+    cases['recommendation.get_recommendations'] = (recommendation_inputs, lambda inputs: engine.get_recommendations(
+        *inputs[0], TIMEFRAMES, *history, inputs[1]))
+
+    fetcher = StubFetcher(prices, volumes)
+    cases['analyzer.run_analysis'] = (lambda: BitcoinAnalyzer(fetcher), lambda analyzer: analyzer.run_analysis())
+    return cases
+
+
+def measure(setup, run, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        with _closing(setup()) as state:
+            gc.collect()
+            start = time.perf_counter()
+            run(state)
+            best = min(best, time.perf_counter() - start)
+
+    with _closing(setup()) as state:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            run(state)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def _closing(state):
+    # States holding threads (an analyzer) are context managers, released after each run
+    return state if hasattr(state, '__exit__') else nullcontext(state)
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=3, only=None, max_seconds=10., report=print):
+    # A case is skipped at a size where scaling its last time linearly would take
+    # it past max_seconds, so the slow pure-Python paths don't stall a 10M run
+    results = {}
+    last_run = {}  # name -> (size, seconds)
+    for size in sorted(sizes):
+        prices, volumes = synthetic_series(size)
+        for name, (setup, run) in benchmark_cases(prices, volumes).items():
+            if only and not any(part in name for part in only):
+                continue
+            key = f'{name}@{size}'
+            if name in last_run:
+                estimate = last_run[name][1] * size / last_run[name][0]
+                if estimate > max_seconds:
+                    results[key] = {'skipped': f'estimated {estimate:.0f}s'}
+                    report(f"{key:<60} skipped (estimated {estimate:.0f}s)")
+                    continue
+            results[key] = measure(setup, run, repeat)
+            last_run[name] = (size, results[key]['seconds'])
+            report(f"{key:<60} {results[key]['seconds'] * 1000:>12.3f} ms {results[key]['peak_bytes'] / 2**20:>10.1f} MiB")
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'sizes': sorted(sizes),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare(results, baseline, max_slowdown=0.25, noise_floor=1e-3):
+    # Returns the cases more than max_slowdown slower than the baseline. Times under
+    # noise_floor seconds are raised to it, so timer jitter on tiny cases is ignored.
+    regressions = []
+    for key, current in results['results'].items():
+        saved = baseline['results'].get(key)
+        if not saved or 'seconds' not in saved or 'seconds' not in current:
+            continue
+        ratio = max(current['seconds'], noise_floor) / max(saved['seconds'], noise_floor)
+        if ratio > 1 + max_slowdown:
+            regressions.append((key, saved['seconds'], current['seconds'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark indicators, recommendations and the analysis pipeline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help="Run only cases whose name contains one of these.")
+    parser.add_argument('--max-seconds', type=float, default=10., help="Skip a case at sizes where it is expected to take longer.")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--baseline', help="Compare against results saved with --output.")
+    parser.add_argument('--max-slowdown', type=float, default=0.25, help="Allowed slowdown against the baseline (0.25 = 25%%).")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.only, args.max_seconds)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_slowdown)
+        for key, before, after, ratio in regressions:
+            print(f"SLOWER {key}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No case is more than {args.max_slowdown:.0%} slower than the baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
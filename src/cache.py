@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from .metrics import metrics
+
+
+class TTLCache:
+    # Time-aware cache for API responses. Keys are tuples whose first element names
+    # the endpoint, which is what the hit/miss counters are grouped by.
+    #
+    # - An entry younger than `ttl` is served as is.
+    # - Up to `stale_ttl` seconds past that it is still served, while a background
+    #   refresh replaces it (stale-while-revalidate).
+    # - Concurrent misses on one key wait on a single in-flight load.
+    # - At most `max_size` entries are kept, least recently used evicted first.
+    def __init__(self, max_size=128, clock=time.monotonic):
+        self.max_size = max_size
+        self.clock = clock
+        self.stats = defaultdict(lambda: {'hits': 0, 'stale_hits': 0, 'misses': 0, 'errors': 0})
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, ttl, stale_ttl=0):
+        stats = self.stats[key[0]]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = self.clock() - stored_at
+                if age <= ttl:
+                    stats['hits'] += 1
+                    metrics.increment('cache_requests_total', endpoint=key[0], result='hit')
+                    self._entries.move_to_end(key)
+                    return value
+                if age <= ttl + stale_ttl:
+                    stats['stale_hits'] += 1
+                    metrics.increment('cache_requests_total', endpoint=key[0], result='stale')
+                    self._entries.move_to_end(key)
+                    if key not in self._in_flight:
+                        future = self._in_flight[key] = Future()
+                        threading.Thread(target=self._load, args=(key, loader, future, True), daemon=True).start()
+                    return value
+            stats['misses'] += 1
+            metrics.increment('cache_requests_total', endpoint=key[0], result='miss')
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if owner:
+            self._load(key, loader, future)
+        return future.result()
+
+    def _load(self, key, loader, future, background=False):
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self.stats[key[0]]['errors'] += 1
+                del self._in_flight[key]
+            metrics.increment('cache_load_errors_total', endpoint=key[0])
+            if background:
+                # Nobody waits on a revalidation, so its failure would otherwise go unnoticed
+                logging.warning(f"Background refresh failed for {key}: {e}")
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            del self._in_flight[key]
+        future.set_result(value)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def hit_ratio(self, endpoint=None):
+        groups = self.stats.values() if endpoint is None else [self.stats[endpoint]]
+        hits = sum(s['hits'] + s['stale_hits'] for s in groups)
+        total = hits + sum(s['misses'] for s in groups)
+        return hits / total if total else 0.
+
+    def __len__(self):
+        return len(self._entries)
\ No newline at end of file
@@ -0,0 +1,156 @@
+import argparse
+import json
+import logging
+import math
+import signal
+import sys
+import threading
+import time
+
+from .serialization import RAW_SERIES, jsonable
+
+# Only the standard library and NumPy are imported up front; the analyzer (and with
+# it requests) is imported when an analysis actually runs, and PyQt5 only for the GUI.
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Bitcoin technical analysis (GUI by default).")
+    parser.add_argument('--headless', action='store_true', help="Run without the GUI and print results.")
+    parser.add_argument('--serve', action='store_true', help="Serve the analysis as JSON over HTTP (see service.py).")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to serve on with --serve.")
+    parser.add_argument('--port', type=int, default=8080, help="Port to serve on with --serve.")
+    parser.add_argument('--max-age', type=float, default=60,
+                        help="Seconds one analysis is served for with --serve before it is refreshed.")
+    parser.add_argument('--interval', type=float, default=0,
+                        help="Seconds between analyses in headless mode; 0 runs once (default).")
+    parser.add_argument('--count', type=int, default=None, help="Stop after this many periodic runs.")
+    parser.add_argument('--format', choices=('text', 'json'), default='text',
+                        help="AnalysisPrinter text, or one JSON object per run.")
+    parser.add_argument('--timezone', default=None, help="Time zone timestamps are shown in.")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="Report how long start-up (imports and set-up) took, on stderr.")
+    parser.add_argument('--base-url', help="API base URL, e.g. a local src.mock_server "
+                                           "(default: $COINGECKO_BASE_URL, then CoinGecko itself).")
+    parser.add_argument('--rate-limit', type=float, help="Requests per minute to send (default: the public API limit).")
+    parser.add_argument('--metrics-file', help="Collect timing metrics and rewrite this file in Prometheus "
+                                                  "text format after every run (textfile collector).")
+    parser.add_argument('--metrics-log', action='store_true',
+                        help="Collect timing metrics and log them as JSON lines after every run.")
+    parser.add_argument('--log-level', default='INFO')
+    return parser
+
+
+def run_periodically(job, interval, stop, count=None):
+    # Runs start on a fixed grid (start + k * interval); a run that overruns skips
+    # the slots it missed instead of firing them back to back.
+    next_run = time.monotonic()
+    runs = 0
+    while not stop.is_set():
+        job()
+        runs += 1
+        if count is not None and runs >= count:
+            break
+        next_run += interval
+        now = time.monotonic()
+        if next_run < now:
+            next_run += math.ceil((now - next_run) / interval) * interval
+        stop.wait(next_run - now)
+
+
+def build_analyzer(args):
+    from .analyzer import BitcoinAnalyzer
+    from .data_fetcher import DataFetcher
+    from .request_scheduler import RequestScheduler
+
+    scheduler = RequestScheduler(rate_per_minute=args.rate_limit) if args.rate_limit else None
+    return BitcoinAnalyzer(DataFetcher(scheduler=scheduler, base_url=args.base_url))
+
+
+def run_headless(args, started=None):
+    from .analysis_printer import AnalysisPrinter, DEFAULT_TIMEZONE
+    from .metrics import metrics
+
+    if args.metrics_file or args.metrics_log:
+        metrics.enable()
+
+    display_timezone = args.timezone or DEFAULT_TIMEZONE
+    analyzer = build_analyzer(args)
+    if args.startup_time and started is not None:
+        print(f"Start-up took {(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+
+    failures = []
+
+    def analyze():
+        try:
+            results = analyzer.run_analysis()
+        except Exception:
+            logging.exception("Analysis failed")
+            results = None
+        finally:
+            if args.metrics_file:
+                metrics.write_prometheus(args.metrics_file)
+            if args.metrics_log:
+                metrics.log_snapshot()
+        if results is None:
+            failures.append(time.time())
+            return
+        if args.format == 'json':
+            output = {key: value for key, value in results.items() if key not in RAW_SERIES}
+            output['generated_at'] = int(time.time() * 1000)
+            print(json.dumps(jsonable(output), allow_nan=False), flush=True)
+        else:
+            print(AnalysisPrinter.format_analysis_results(results, display_timezone), flush=True)
+
+    with analyzer:
+        if args.interval <= 0:
+            analyze()
+            return 1 if failures else 0
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        try:
+            run_periodically(analyze, args.interval, stop, args.count)
+        except KeyboardInterrupt:
+            pass
+        return 1 if failures else 0
+
+
+def run_service(args, started=None):
+    from .metrics import metrics
+    from .service import AnalysisService
+
+    # Always collected here, for GET /metrics
+    metrics.enable()
+    with build_analyzer(args) as analyzer:
+        service = AnalysisService(analyzer, max_age=args.max_age)
+        if args.startup_time and started is not None:
+            print(f"Start-up took {(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+        try:
+            service.run(args.host, args.port)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def run_gui(args, started=None):
+    from PyQt5.QtWidgets import QApplication
+    from .gui.bitcoin_analyzer_gui import BitcoinAnalyzerGUI
+    from .analysis_printer import DEFAULT_TIMEZONE
+
+    app = QApplication(sys.argv[:1])
+    with build_analyzer(args) as analyzer:
+        window = BitcoinAnalyzerGUI(args.timezone or DEFAULT_TIMEZONE, analyzer)
+        window.show()
+        if args.startup_time and started is not None:
+            print(f"Start-up took {(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+        return app.exec_()
+
+
+def main(argv=None, started=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.serve:
+        return run_service(args, started)
+    if args.headless:
+        return run_headless(args, started)
+    return run_gui(args, started)
@@ -1,61 +1,263 @@
+import math
+import os
+import time
+import numpy as np
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from pytz import timezone
-from functools import lru_cache
+from urllib.parse import urlsplit
+from .cache import TTLCache
+from .dataset import OHLCVDataset
+from .metrics import metrics
+from .request_scheduler import shared_scheduler
+from .ohlcv_store import OHLCVStore
+from .resampling import Resampler
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+
+# market_chart/range picks its granularity from the span requested: up to a day
+# gives 5-minute points, up to 90 days hourly points, anything longer daily ones.
+# (minimum span, maximum span) of a request for each resolution:
+RANGE_SPANS_MS = {
+    '5m': (0, DAY_MS),
+    'hourly': (DAY_MS + HOUR_MS, 90 * DAY_MS),
+    'daily': (91 * DAY_MS, None)
+}
+DEFAULT_STORE_DIR = os.path.join(os.path.expanduser('~'), '.bitcoin_analyzer')
+DEFAULT_BASE_URL = "https://api.coingecko.com/api/v3"
+# Points every DataFetcher at another API host (e.g. src.mock_server) unless one is passed in
+BASE_URL_ENV = 'COINGECKO_BASE_URL'
 
 class DataFetcher:
-    def __init__(self):
-        self.base_url = "https://api.coingecko.com/api/v3"
+    def __init__(self, coin_id='bitcoin', store_dir=DEFAULT_STORE_DIR, scheduler=None, base_url=None,
+                 dtype=np.float64):
+        self.base_url = (base_url or os.environ.get(BASE_URL_ENV) or DEFAULT_BASE_URL).rstrip('/')
+        self.coin_id = coin_id
         self.currency = "usd"
         self.days = 365
-        self.prices = []
-        self.volumes = []
-        self.dates = []
+        self.price_max_age = 30  # Seconds a real-time price is served from cache
+        self.max_age = 60  # Seconds a stored price series is considered current
+        self.ohlc_max_age = 30 * 60  # CoinGecko's 1-day OHLC candles are 30 minutes wide
+        self.stale_max_age = 5 * 60  # Extra seconds a stale value is served while it refreshes
+        self.cache = TTLCache(max_size=32)
+        self.scheduler = scheduler or shared_scheduler()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='data-fetcher')
+        self.dtype = dtype  # Of the price and volume columns; np.float32 halves their memory
+        self.dataset = OHLCVDataset.empty(dtype)  # Analysed window
+        self._series = None
+        self._resamplers = {}  # resolution -> Resampler of the analysed window
         self.high_price = None
         self.low_price = None
+        # Each coin is stored under its own id; pass store_dir=None to keep everything in memory.
+        # Data from any other host is kept apart, so a mock server never pollutes the real history.
+        if store_dir and self.base_url != DEFAULT_BASE_URL:
+            store_dir = os.path.join(store_dir, 'hosts', urlsplit(self.base_url).netloc.replace(':', '_'))
+        self.store = OHLCVStore(os.path.join(store_dir, coin_id)) if store_dir else None
+        if self.store:
+            self._set_series(self.store.series.load())
+
+    def close(self):
+        self._executor.shutdown()
 
-    @lru_cache(maxsize=1)
     def fetch_real_time_price(self):
-        url = f"{self.base_url}/simple/price"
-        params = {"ids": "bitcoin", "vs_currencies": self.currency}
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()["bitcoin"][self.currency]
+            with metrics.timer('fetch_seconds', operation='real_time_price'):
+                return self.cache.get(("simple/price", self.coin_id, self.currency), self._fetch_real_time_price,
+                                      ttl=self.price_max_age, stale_ttl=self.stale_max_age)
         except requests.RequestException as e:
-            print(f"Error fetching real-time BTC price: {e}")
+            print(f"Error fetching real-time {self.coin_id} price: {e}")
             return None
 
-    @lru_cache(maxsize=1)
-    def fetch_historical_data(self):
-        url = f"{self.base_url}/coins/bitcoin/market_chart"
-        params = {"vs_currency": self.currency, "days": self.days}
+    def _fetch_real_time_price(self):
+        url = f"{self.base_url}/simple/price"
+        params = {"ids": self.coin_id, "vs_currencies": self.currency}
+        return self.scheduler.get_json(url, params=params)[self.coin_id][self.currency]
+
+    def fetch_all(self):
+        # The price, market_chart and ohlc calls are independent, so they run side by
+        # side on the pooled session and take as long as the slowest one.
+        real_time_price = self._executor.submit(self.fetch_real_time_price)
+        historical = self.fetch_historical_data()
+        return real_time_price.result(), historical
+
+    def fetch_historical_data(self, include_high_low=True):
+        # Fetch daily high and low (batch scans skip it, saving one request per coin)
+        high_low = self._executor.submit(self._fetch_daily_high_low) if include_high_low else None
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            self.prices = [p[1] for p in data["prices"]]
-            self.volumes = [v[1] for v in data["total_volumes"]]
-            self.dates = [datetime.utcfromtimestamp(p[0] / 1000).astimezone(timezone('America/Sao_Paulo')).strftime('%Y-%m-%d %H:%M:%S') for p in data["prices"]]
-            
-            # Fetch daily high and low
-            self._fetch_daily_high_low()
-            
+            with metrics.timer('fetch_seconds', operation='historical'):
+                series = self.cache.get(("market_chart", self.coin_id, self.currency, self.days), self._fetch_series,
+                                        ttl=self.max_age, stale_ttl=self.stale_max_age)
+            if series is not self._series:
+                self._set_series(series)
             return True
         except requests.RequestException as e:
-            print(f"Error fetching historical BTC data: {e}")
+            print(f"Error fetching historical {self.coin_id} data: {e}")
             return False
+        finally:
+            if high_low is not None:
+                high_low.result()
 
-    def _fetch_daily_high_low(self):
-        url = f"{self.base_url}/coins/bitcoin/ohlc"
-        params = {"vs_currency": self.currency, "days": 1}
+    def _fetch_series(self):
+        # Cached as a dataset, so its columns are converted (if at all) once per fetch
+        return OHLCVDataset.from_series(self._load_series(), self.dtype)
+
+    def _load_series(self):
+        now_ms = time.time() * 1000
+        stored = self.store.series.load() if self.store else None
+        if stored is not None and len(stored['timestamp']):
+            timestamps = stored['timestamp']
+            if now_ms - timestamps[-1] <= self.max_age * 1000:
+                return stored
+            # Only the missing tail is requested; it starts at or before the last stored
+            # point, which may have been a live (intra-day) point and gets replaced.
+            tail_days = math.ceil((now_ms - timestamps[-1]) / DAY_MS) + 1
+            if timestamps[0] <= now_ms - (self.days - 1) * DAY_MS and tail_days < self.days:
+                self._merge_series(self._fetch_market_chart({"days": tail_days, "interval": "daily"}))
+                return self.store.series.load()
+
+        series = self._fetch_market_chart({"days": self.days})
+        if not self.store:
+            return series
+        self._merge_series(series)
+        return self.store.series.load()
+
+    def _fetch_market_chart(self, params):
+        url = f"{self.base_url}/coins/{self.coin_id}/market_chart"
+        return self._decode_chart(self.scheduler.get_json(url, params={"vs_currency": self.currency, **params}))
+
+    @staticmethod
+    def _decode_chart(data):
+        with metrics.timer('decode_seconds', endpoint='market_chart'):
+            return DataFetcher._decode_chart_arrays(data)
+
+    @staticmethod
+    def _decode_chart_arrays(data):
+        # Whole [[timestamp, value], ...] lists go to NumPy at once rather than point by point
+        prices = np.array(data["prices"], dtype=float).reshape(-1, 2)
+        volumes = np.array(data["total_volumes"], dtype=float).reshape(-1, 2)
+        timestamps = prices[:, 0].astype(np.int64)
+        if len(volumes) == len(prices) and np.array_equal(volumes[:, 0], prices[:, 0]):
+            volume = volumes[:, 1]
+        elif len(volumes):
+            # Volumes occasionally come back on a slightly different time grid. Each price
+            # then takes the latest volume at or before it (the first volume for prices
+            # before that), so no gap turns into a NaN that would spread through OBV,
+            # MFI and the rolling sums.
+            volume_timestamps = volumes[:, 0].astype(np.int64)
+            index = np.maximum(np.searchsorted(volume_timestamps, timestamps, side='right') - 1, 0)
+            volume = volumes[index, 1]
+        else:
+            volume = np.zeros(len(prices))
+        return {'timestamp': timestamps, 'price': prices[:, 1], 'volume': volume}
+
+    def fetch_range(self, start, end, resolution='hourly'):
+        # Arbitrary [start, end] history (datetimes or epoch seconds) at '5m', 'hourly'
+        # or 'daily' resolution. The range is cut into windows the API serves at that
+        # resolution, all windows are queued on the scheduler at once, and each one is
+        # decoded as it arrives so only one raw JSON payload is alive at a time.
+        if resolution not in RANGE_SPANS_MS:
+            raise ValueError(f"Unknown resolution: {resolution}. Use one of {list(RANGE_SPANS_MS)}.")
+        start_ms, end_ms = self._epoch_ms(start), self._epoch_ms(end)
+        if end_ms <= start_ms:
+            raise ValueError("The end of the range must be after its start.")
+        min_span, max_span = RANGE_SPANS_MS[resolution]
+        request_start = min(start_ms, end_ms - min_span)
+        windows = 1 if max_span is None else math.ceil((end_ms - request_start) / max_span)
+        bounds = np.linspace(request_start, end_ms, windows + 1) / 1000
+
+        url = f"{self.base_url}/coins/{self.coin_id}/market_chart/range"
+        futures = {}
+        for i in range(windows):
+            params = {"vs_currency": self.currency, "from": int(bounds[i]), "to": int(np.ceil(bounds[i + 1]))}
+            futures[self.scheduler.submit(url, params)] = i
+        chunks = [None] * windows
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            self.high_price = max(item[2] for item in data)  # High is the 3rd element
-            self.low_price = min(item[3] for item in data)   # Low is the 4th element
+            with metrics.timer('fetch_seconds', operation='range'):
+                for future in as_completed(futures):
+                    chunks[futures[future]] = self._decode_chart(future.result())
         except requests.RequestException as e:
-            print(f"Error fetching daily high/low BTC data: {e}")
+            print(f"Error fetching {self.coin_id} range data: {e}")
+            return None
+
+        series = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+        # Windows share their boundary points; keep one point per timestamp within [start, end]
+        order = np.argsort(series['timestamp'], kind='stable')
+        timestamps = series['timestamp'][order]
+        keep = (timestamps >= start_ms) & (timestamps <= end_ms)
+        keep[1:] &= timestamps[1:] != timestamps[:-1]
+        return {name: column[order][keep] for name, column in series.items()}
+
+    @staticmethod
+    def _epoch_ms(value):
+        if isinstance(value, datetime):
+            return int(value.timestamp() * 1000)
+        return int(value * 1000)
+
+    def _merge_series(self, series):
+        if self.store:
+            self.store.series.merge(series)
+
+    def _set_series(self, series):
+        self._series = series
+        if not isinstance(series, OHLCVDataset):
+            series = OHLCVDataset.from_series(series, self.dtype)
+        timestamps = series.timestamp
+        # Only the configured window is analysed, however much history is stored
+        start = np.searchsorted(timestamps, timestamps[-1] - self.days * DAY_MS) if len(timestamps) else 0
+        self.dataset = series[start:]
+
+    # Views on the analysed window's columns
+    @property
+    def timestamps(self):
+        return self.dataset.timestamp  # Epoch milliseconds, formatted only for display
+
+    @property
+    def prices(self):
+        return self.dataset.close
+
+    @property
+    def volumes(self):
+        return self.dataset.volume
+
+    def bars(self, resolution):
+        # OHLCV bars of the analysed window ('week', 'month' or a width in ms), cached
+        # per resolution and brought up to date incrementally when new data arrives
+        resampler = self._resamplers.get(resolution)
+        if resampler is None:
+            resampler = self._resamplers[resolution] = Resampler(resolution)
+        return resampler.update(self.dataset)
+
+    def _fetch_daily_high_low(self):
+        try:
+            with metrics.timer('fetch_seconds', operation='high_low'):
+                self.high_price, self.low_price = self.cache.get(
+                    ("ohlc", self.coin_id, self.currency), self._load_daily_high_low,
+                    ttl=self.ohlc_max_age, stale_ttl=self.stale_max_age)
+        except (requests.RequestException, IndexError, ValueError) as e:
+            print(f"Error fetching daily high/low {self.coin_id} data: {e}")
             self.high_price = None
-            self.low_price = None
\ No newline at end of file
+            self.low_price = None
+
+    def _load_daily_high_low(self):
+        now_ms = time.time() * 1000
+        candles = self.store.ohlc.load() if self.store else None
+        if candles is None or not len(candles['timestamp']) or now_ms - candles['timestamp'][-1] > self.ohlc_max_age * 1000:
+            candles = self._fetch_ohlc()
+            if self.store:
+                self.store.ohlc.merge(candles)
+                candles = self.store.ohlc.load()
+        recent = candles['timestamp'] > candles['timestamp'][-1] - DAY_MS
+        return float(candles['high'][recent].max()), float(candles['low'][recent].min())
+
+    def _fetch_ohlc(self):
+        url = f"{self.base_url}/coins/{self.coin_id}/ohlc"
+        params = {"vs_currency": self.currency, "days": 1}
+        data = np.array(self.scheduler.get_json(url, params=params), dtype=float).reshape(-1, 5)
+        return {
+            'timestamp': data[:, 0].astype(np.int64),
+            'open': data[:, 1],
+            'high': data[:, 2],  # High is the 3rd element
+            'low': data[:, 3],   # Low is the 4th element
+            'close': data[:, 4]
+        }
\ No newline at end of file
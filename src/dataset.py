@@ -0,0 +1,130 @@
+import numpy as np
+
+# Columnar OHLCV data as it moves through the pipeline: one contiguous NumPy array
+# per column, built once when the data is loaded. Slicing rows (dataset[-365:])
+# gives another dataset of views on the same memory, so the fetcher's analysed
+# window and the indicators read the same arrays. CoinGecko's market_chart only
+# has closes; open, high and low are then the close column itself rather than
+# copies of it.
+#
+# Price and volume columns are float64 by default; dtype=np.float32 halves their
+# memory, and the calculations still run in float64 on the fly. Columns are
+# read-only, since every consumer shares them.
+#
+# A dataset reads like the column dicts of ohlcv_store.py and resampling.py
+# ('price' is an alias of 'close'), so it can be passed wherever those are; len()
+# is its number of rows.
+
+COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+ALIASES = {'price': 'close'}
+
+
+def as_float_array(values):
+    # values as a floating-point array without copying one that already is, so
+    # float32 columns stay float32
+    values = np.asarray(values)
+    return values if values.dtype.kind == 'f' else values.astype(float)
+
+
+def _read_only(column):
+    # A read-only view, leaving the caller's own array writable
+    view = column.view()
+    view.flags.writeable = False
+    return view
+
+
+class OHLCVDataset:
+    def __init__(self, timestamp, close, open=None, high=None, low=None, volume=None, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        close = np.ascontiguousarray(close, dtype=self.dtype)
+        columns = {
+            'timestamp': np.ascontiguousarray(timestamp, dtype=np.int64),
+            'open': open, 'high': high, 'low': low, 'close': close,
+            'volume': np.zeros(len(close), dtype=self.dtype) if volume is None else volume
+        }
+        for name, column in columns.items():
+            if column is None:
+                column = close
+            elif name != 'timestamp':
+                column = np.ascontiguousarray(column, dtype=self.dtype)
+            if column.shape != close.shape:
+                raise ValueError(f"Column {name!r} has shape {column.shape}, expected {close.shape}.")
+            columns[name] = column
+        self._columns = {name: _read_only(column) for name, column in columns.items()}
+
+    @classmethod
+    def from_series(cls, series, dtype=np.float64):
+        # From a column dict with 'timestamp' and 'close' or 'price', and any of the others
+        close = series['close'] if 'close' in series else series['price']
+        return cls(series['timestamp'], close, series.get('open'), series.get('high'), series.get('low'),
+                   series.get('volume'), dtype)
+
+    @classmethod
+    def empty(cls, dtype=np.float64):
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=dtype), dtype=dtype)
+
+    def _view(self, rows):
+        dataset = object.__new__(OHLCVDataset)
+        dataset.dtype = self.dtype
+        dataset._columns = {name: column[rows] for name, column in self._columns.items()}
+        return dataset
+
+    def __getitem__(self, key):
+        # A column by name, or a dataset of the rows in a slice (views, never copies)
+        if isinstance(key, slice):
+            return self._view(key)
+        return self._columns[ALIASES.get(key, key)]
+
+    def __contains__(self, name):
+        return ALIASES.get(name, name) in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns['timestamp'])
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def keys(self):
+        return self._columns.keys()
+
+    def items(self):
+        return self._columns.items()
+
+    @property
+    def timestamp(self):
+        return self._columns['timestamp']
+
+    @property
+    def open(self):
+        return self._columns['open']
+
+    @property
+    def high(self):
+        return self._columns['high']
+
+    @property
+    def low(self):
+        return self._columns['low']
+
+    @property
+    def close(self):
+        return self._columns['close']
+
+    @property
+    def volume(self):
+        return self._columns['volume']
+
+    @property
+    def nbytes(self):
+        # Memory the columns refer to, counting shared buffers (e.g. open/high/low
+        # standing in for close) once
+        buffers = {}
+        for column in self._columns.values():
+            base = column
+            while base.base is not None and isinstance(base.base, np.ndarray):
+                base = base.base
+            buffers[id(base)] = base.nbytes
+        return sum(buffers.values())
@@ -0,0 +1,114 @@
+from collections import deque
+import numpy as np
+from .rolling import rolling_mean, rolling_slope
+
+# Least-squares straight-line forecasts with x = 0, 1, ..., n - 1 (the bar index).
+# Horizon h is h bars after the last point fitted and may be a scalar or a
+# sequence (one forecast per horizon, on a new last axis). The batch functions
+# work along the last axis like the rest of the indicator code.
+
+
+def _extrapolate(intercept, slope, last, horizons):
+    horizons = np.asarray(horizons, dtype=float)
+    if horizons.ndim == 0:
+        return intercept + slope * (last + horizons)
+    return np.asarray(intercept)[..., None] + np.asarray(slope)[..., None] * (last + horizons)
+
+
+def linear_trend(values):
+    # (intercept, slope) of the closed-form fit; x is centred so the sums stay small
+    y = np.asarray(values, dtype=float)
+    n = y.shape[-1]
+    if n < 2:
+        raise ValueError("Insufficient data. Need at least 2 values for a trend.")
+    x = np.arange(n) - (n - 1) / 2
+    slope = (y @ x) / (x @ x)
+    return y.mean(axis=-1) - slope * (n - 1) / 2, slope
+
+
+def linear_forecast(values, horizons=1, window=None):
+    # Fit over the whole series, or only its last `window` points
+    y = np.asarray(values, dtype=float)
+    if window is not None:
+        y = y[..., -window:]
+    intercept, slope = linear_trend(y)
+    return _extrapolate(intercept, slope, y.shape[-1] - 1, horizons)
+
+
+def rolling_linear_forecast(values, window, horizons=1):
+    # The forecast made at every bar from its trailing window ('valid' part only,
+    # like rolling.py: out[j] is fitted on values[j:j+window]), all in O(n)
+    slope = rolling_slope(values, window)
+    intercept = rolling_mean(values, window) - slope * (window - 1) / 2
+    return _extrapolate(intercept, slope, window - 1, horizons)
+
+
+class LinearTrendForecaster:
+    # Recursive least squares for a straight line, O(1) per point. Only the count,
+    # sum(y) and sum(x * y) are kept (taken around a reference value), since the x
+    # sums of 0..n-1 have closed forms. With a window, dropping the oldest point
+    # shifts every x down by one, which is just sum(y) off sum(x * y); as in
+    # _RollingWindow, the sums are rebuilt every `window` points to bound drift.
+    def __init__(self, window=None):
+        self.window = window
+        self.values = deque(maxlen=window) if window else None
+        self.count = 0
+        self.reference = None
+        self.total = 0.
+        self.moment = 0.
+        self.pushes = 0
+
+    def update(self, value):
+        value = float(value)
+        if self.reference is None:
+            self.reference = value
+        if self.window and self.count == self.window:
+            self.total -= self.values[0] - self.reference
+            self.moment -= self.total
+            self.count -= 1
+        deviation = value - self.reference
+        self.moment += self.count * deviation
+        self.total += deviation
+        self.count += 1
+        if self.window:
+            self.values.append(value)
+            self.pushes += 1
+            if self.pushes % self.window == 0:
+                self._resync()
+
+    def _resync(self):
+        self.reference = self.values[-1]
+        deviations = [v - self.reference for v in self.values]
+        self.total = sum(deviations)
+        self.moment = sum(x * d for x, d in enumerate(deviations))
+
+    @property
+    def slope(self):
+        if self.count < 2:
+            return None
+        n = self.count
+        return (self.moment - (n - 1) / 2 * self.total) / (n * (n * n - 1) / 12)
+
+    @property
+    def intercept(self):
+        if self.count < 2:
+            return None
+        return self.total / self.count + self.reference - self.slope * (self.count - 1) / 2
+
+    def predict(self, horizons=1):
+        if self.count < 2:
+            return None
+        return _extrapolate(self.intercept, self.slope, self.count - 1, horizons)
+
+    def snapshot(self):
+        return {'values': None if self.values is None else list(self.values), 'count': self.count,
+                'reference': self.reference, 'total': self.total, 'moment': self.moment, 'pushes': self.pushes}
+
+    def restore(self, state):
+        if self.window:
+            self.values = deque(state['values'], maxlen=self.window)
+        self.count = state['count']
+        self.reference = state['reference']
+        self.total = state['total']
+        self.moment = state['moment']
+        self.pushes = state['pushes']
@@ -1,10 +1,12 @@
 # src/gui/bitcoin_analyzer_gui.py
+import threading
 from PyQt5.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, 
                              QWidget, QPushButton, QTextEdit, QLabel, QFrame)
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QThreadPool
 from PyQt5.QtGui import QFont, QIcon
 from src.analyzer import BitcoinAnalyzer
-from src.analysis_printer import AnalysisPrinter
+from src.analysis_printer import AnalysisPrinter, DEFAULT_TIMEZONE
+from src.gui.workers import Worker, AnalysisWorker
 
 class ModernButton(QPushButton):
     def __init__(self, text, parent=None):
@@ -30,8 +32,9 @@ class ModernButton(QPushButton):
         """)
 
 class BitcoinAnalyzerGUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, display_timezone=DEFAULT_TIMEZONE, analyzer=None):
         super().__init__()
+        self.display_timezone = display_timezone
         self.setWindowTitle("Bitcoin Analyzer")
         self.setGeometry(100, 100, 1000, 700)
         self.setStyleSheet("background-color: #f0f0f0;")
@@ -44,9 +47,18 @@ class BitcoinAnalyzerGUI(QMainWindow):
         self.setup_content()
         self.setup_footer()
 
-        self.analyzer = BitcoinAnalyzer()
+        self.analyzer = analyzer or BitcoinAnalyzer()
         self.printer = AnalysisPrinter()
 
+        # Analyses run one at a time on their own pool: a new request cancels the
+        # running one, which stops at its next stage boundary before the next starts.
+        self.analysis_pool = QThreadPool(self)
+        self.analysis_pool.setMaxThreadCount(1)
+        self.analysis_job = 0
+        self.analysis_cancel = None
+        self.price_pool = QThreadPool(self)
+        self.price_pending = False
+
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_price)
         self.timer.start(60000)  # Update every minute
@@ -110,19 +122,57 @@ class BitcoinAnalyzerGUI(QMainWindow):
         self.main_layout.addWidget(footer)
 
     def run_analysis(self):
+        if self.analysis_cancel is not None:
+            self.analysis_cancel.set()
+        self.analysis_job += 1
+        self.analysis_cancel = threading.Event()
+
         self.results_display.clear()
         self.results_display.append("Running analysis...")
-        
-        analysis_results = self.analyzer.run_analysis()
-        
+
+        worker = AnalysisWorker(self.analysis_job, self.analyzer, self.analysis_cancel)
+        worker.signals.progress.connect(self.on_analysis_progress)
+        worker.signals.finished.connect(self.on_analysis_finished)
+        worker.signals.failed.connect(self.on_analysis_failed)
+        self.analysis_pool.start(worker)
+
+    def on_analysis_progress(self, job_id, message):
+        if job_id == self.analysis_job:
+            self.results_display.append(message)
+
+    def on_analysis_finished(self, job_id, analysis_results):
+        if job_id != self.analysis_job:
+            return  # Superseded by a newer analysis
+        self.analysis_cancel = None
+
         if analysis_results:
-            formatted_results = self.printer.format_analysis_results(analysis_results)
+            formatted_results = self.printer.format_analysis_results(analysis_results, self.display_timezone)
             self.results_display.setPlainText(formatted_results)
+            self.show_price(analysis_results['real_time_price'])
         else:
             self.results_display.append("Analysis failed. Please check the logs for more information.")
 
+    def on_analysis_failed(self, job_id, message):
+        if job_id != self.analysis_job:
+            return
+        self.analysis_cancel = None
+        self.results_display.append(f"Analysis failed: {message}")
+
     def update_price(self):
-        real_time_price = self.analyzer.data_fetcher.fetch_real_time_price()
+        # Timer ticks that arrive while a refresh is still running are folded into it
+        if self.price_pending:
+            return
+        self.price_pending = True
+        worker = Worker(0, self.analyzer.data_fetcher.fetch_real_time_price)
+        worker.signals.finished.connect(self.on_price_fetched)
+        worker.signals.failed.connect(lambda job_id, message: self.on_price_fetched(job_id, None))
+        self.price_pool.start(worker)
+
+    def on_price_fetched(self, job_id, real_time_price):
+        self.price_pending = False
+        self.show_price(real_time_price)
+
+    def show_price(self, real_time_price):
         if real_time_price is not None:
             self.price_label.setText(f"Current BTC Price: ${real_time_price:.2f}")
         else:
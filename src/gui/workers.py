@@ -0,0 +1,43 @@
+# src/gui/workers.py
+import logging
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+class WorkerSignals(QObject):
+    # Every signal carries the job id so the window can drop results of superseded jobs
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+class Worker(QRunnable):
+    # Runs fn(*args, **kwargs) on a QThreadPool thread and reports back through
+    # queued signals, so nothing blocking ever runs on the Qt event loop.
+    def __init__(self, job_id, fn, *args, **kwargs):
+        super().__init__()
+        self.job_id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def report(self, message):
+        self.signals.progress.emit(self.job_id, message)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            logging.exception("Background job failed")
+            self.signals.failed.emit(self.job_id, str(e))
+        else:
+            self.signals.finished.emit(self.job_id, result)
+
+class AnalysisWorker(Worker):
+    def __init__(self, job_id, analyzer, cancel_event):
+        super().__init__(job_id, analyzer.run_analysis)
+        self.cancel_event = cancel_event
+        self.kwargs = {'progress': self.report, 'cancelled': cancel_event.is_set}
+
+    def run(self):
+        # Superseded while still queued behind the previous analysis
+        if not self.cancel_event.is_set():
+            super().run()
\ No newline at end of file
@@ -0,0 +1,38 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .metrics import metrics
+
+# 429s are left to the RequestScheduler, which pauses every queued request (urllib3
+# would otherwise retry any response carrying Retry-After on its own)
+RETRY_STATUSES = (500, 502, 503, 504)
+
+def endpoint_for(url):
+    # Metric label for a request: the last path segment ('price', 'market_chart',
+    # 'range', 'ohlc'), which leaves the coin id out
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+
+class HttpClient:
+    # One pooled keep-alive Session shared by every request (and thread) that goes
+    # through it, so repeated calls to the API host reuse their TCP/TLS connections.
+    # Transient failures are retried with exponential backoff.
+    def __init__(self, timeout=(5, 30), retries=3, backoff_factor=0.5, pool_size=10):
+        self.timeout = timeout  # (connect, read) seconds
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=frozenset(['GET']), respect_retry_after_header=False, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_json(self, url, params=None):
+        endpoint = endpoint_for(url)
+        with metrics.timer('http_request_seconds', endpoint=endpoint):
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        with metrics.timer('json_parse_seconds', endpoint=endpoint):
+            return response.json()
+
+    def close(self):
+        self.session.close()
\ No newline at end of file
@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .metrics import metrics
+
+
+class IndicatorNode:
+    # One named output: an Indicators method, the parameters it is called with and
+    # the nodes whose results it reuses (e.g. MACD reuses the memoized EMAs).
+    def __init__(self, method: str, inputs: Iterable[str] = (), **params):
+        self.method = method
+        self.inputs = tuple(inputs)
+        self.params = params
+
+
+DEFAULT_NODES = {
+    'volume_ma': IndicatorNode('calculate_volume_ma'),
+    'volatility': IndicatorNode('calculate_volatility'),
+    'rsi': IndicatorNode('calculate_rsi'),
+    'percentage_change': IndicatorNode('calculate_percentage_change'),
+    'predicted_price': IndicatorNode('calculate_linear_regression'),
+    'bollinger_bands': IndicatorNode('calculate_bollinger_bands'),
+    'ema': IndicatorNode('calculate_ema'),
+    'ema_short': IndicatorNode('calculate_ema', period=12),
+    'ema_long': IndicatorNode('calculate_ema', period=26),
+    'fib_levels': IndicatorNode('calculate_fibonacci_levels'),
+    'macd': IndicatorNode('calculate_macd', inputs=('ema_short', 'ema_long'), short=12, long=26),
+    'adx': IndicatorNode('calculate_adx'),
+    'stochastic': IndicatorNode('calculate_stochastic'),
+    'ichimoku_cloud': IndicatorNode('calculate_ichimoku_cloud'),
+    'pivot_points': IndicatorNode('calculate_pivot_points'),
+}
+
+
+class IndicatorGraph:
+    # Declarative registry over an Indicators instance. compute() evaluates only the
+    # requested nodes and their inputs, runs nodes whose inputs are ready
+    # concurrently (the NumPy kernels release the GIL), and relies on the
+    # per-data-version memoization in Indicators so shared intermediates are
+    # computed once per run and repeated calls on unchanged data are free.
+    def __init__(self, indicators, nodes: Optional[Dict[str, IndicatorNode]] = None, max_workers: Optional[int] = None):
+        self.indicators = indicators
+        self.nodes = dict(DEFAULT_NODES if nodes is None else nodes)
+        self.max_workers = max_workers
+        self._executor = None
+
+    def register(self, name: str, method: str, inputs: Iterable[str] = (), **params):
+        self.nodes[name] = IndicatorNode(method, inputs, **params)
+
+    def compute(self, names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        names = list(self.nodes) if names is None else list(names)
+        order = self._resolve(names)
+        if self.max_workers == 1:
+            results = {name: self._evaluate(name) for name in order}
+        else:
+            results = self._compute_concurrently(order)
+        return {name: results[name] for name in names}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _evaluate(self, name: str) -> Any:
+        node = self.nodes[name]
+        with metrics.timer('indicator_seconds', indicator=name):
+            return getattr(self.indicators, node.method)(**node.params)
+
+    def _resolve(self, names: List[str]) -> List[str]:
+        # Depth-first topological order over the requested nodes and their inputs
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name not in self.nodes:
+                raise KeyError(f"Unknown indicator: {name}")
+            if name in visiting:
+                raise ValueError(f"Indicator dependency cycle through: {name}")
+            visiting.add(name)
+            for dependency in self.nodes[name].inputs:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def _compute_concurrently(self, order: List[str]) -> Dict[str, Any]:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='indicators')
+        results: Dict[str, Any] = {}
+        pending = list(order)
+        running: Dict[Any, str] = {}
+        while pending or running:
+            ready: List[Tuple[int, str]] = [(i, name) for i, name in enumerate(pending)
+                                             if all(dep in results for dep in self.nodes[name].inputs)]
+            for i, name in reversed(ready):
+                del pending[i]
+                running[self._executor.submit(self._evaluate, name)] = name
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[running.pop(future)] = future.result()
+        return results
\ No newline at end of file
@@ -1,150 +1,251 @@
+import functools
+import inspect
+import threading
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
+from .dataset import as_float_array
+from .forecasting import linear_forecast
+from .smoothing import exponential_smoothing, wilder_smoothing
+from .rolling import rolling_sum, rolling_mean, rolling_std, rolling_min, rolling_max
+from .volume_analytics import money_flow_index, on_balance_volume, relative_volume, vwap
+
+def _freeze(value):
+    # Memoized results are shared between callers, so arrays are handed out read-only
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            _freeze(item)
+    return value
+
+def _latest(series):
+    # Last value along the time axis: a scalar for a 1-D series, one per asset for a matrix
+    return series[..., -1][()]
+
+_MISSING = object()
+
+def memoized(method):
+    # Caches a calculation per (data version, method, bound parameters); set_data
+    # bumps the version, so results never outlive the data they were computed from.
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        # IndicatorGraph calls methods from several threads: the version and its cache
+        # are read together, and a result computed twice at once is stored only once
+        with self._lock:
+            version, cache = self.version, self._cache
+        key = (version, method.__name__, tuple(bound.arguments.items())[1:])
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable arguments (such as a list of horizons) are computed afresh
+            return method(self, *args, **kwargs)
+        with self._lock:
+            result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = _freeze(method(self, *args, **kwargs))
+            with self._lock:
+                result = cache.setdefault(key, result)
+        # A list is copied so that callers changing theirs leave the cached one alone
+        return list(result) if isinstance(result, list) else result
+    return wrapper
 
 class Indicators:
+    # Prices and volumes may be 1-D series or (assets x time) matrices; every
+    # calculation runs along the last axis, so a whole universe goes through in one pass.
     def __init__(self):
-        self.prices = []
-        self.volumes = []
+        self.prices = np.empty(0)
+        self.volumes = np.empty(0)
+        self.version = 0
+        self._cache = {}
+        self._lock = threading.Lock()
 
     def set_data(self, prices, volumes):
-        self.prices = np.array(prices)
-        self.volumes = np.array(volumes)
+        # Arrays (such as OHLCVDataset columns) are used in place, not copied
+        with self._lock:
+            self.prices = as_float_array(prices)
+            self.volumes = as_float_array(volumes)
+            self.version += 1
+            self._cache = {}
 
+    @memoized
     def calculate_volume_ma(self, period=8):
-        return np.convolve(self.volumes, np.ones(period), 'valid') / period / 1e9
+        return rolling_mean(self.volumes, period) / 1e9
 
+    @memoized
     def calculate_percentage_change(self, period=8):
-        if len(self.prices) < period + 1:
+        if self.prices.shape[-1] < period + 1:
             raise ValueError(f"Insufficient price data. Need at least {period + 1} prices.")
-        return ((self.prices[-1] - self.prices[-period-1]) / self.prices[-period-1]) * 100
+        return ((self.prices[..., -1] - self.prices[..., -period-1]) / self.prices[..., -period-1]) * 100
 
+    @memoized
     def calculate_volatility(self, period=8):
-        if len(self.prices) < period:
+        if self.prices.shape[-1] < period:
             raise ValueError(f"Insufficient price data. Need at least {period} prices.")
-        returns = np.diff(np.log(self.prices[-period:]))
-        return np.std(returns) * np.sqrt(252)  # Annualized volatility
+        returns = np.diff(np.log(self.prices[..., -period:]), axis=-1)
+        return np.std(returns, axis=-1) * np.sqrt(252)  # Annualized volatility
 
-    def calculate_linear_regression(self, days_ahead=1):
-        x = np.arange(len(self.prices)).reshape(-1, 1)
-        y = self.prices
-        x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42)
-        model = LinearRegression().fit(x_train, y_train)
-        return model.predict(np.array([[len(self.prices) + days_ahead]]))[0]
+    @memoized
+    def calculate_linear_regression(self, days_ahead=1, window=None):
+        # Predicts at bar index len(prices) + days_ahead, i.e. days_ahead + 1 bars past
+        # the last price; days_ahead may be a tuple for several horizons at once.
+        return linear_forecast(self.prices, np.asarray(days_ahead) + 1, window)
 
-    def calculate_bollinger_bands(self, period=20, num_std=2):
-        if len(self.prices) < period:
+    # The *_series methods return the whole indicator history, aligned with the end of
+    # self.prices (element -k belongs to bar -k), for callers that need every bar
+    @memoized
+    def calculate_bollinger_band_series(self, period=20, num_std=2):
+        if self.prices.shape[-1] < period:
             raise ValueError(f"Insufficient price data. Need at least {period} prices.")
-        ma = np.convolve(self.prices, np.ones(period), 'valid') / period
-        std = np.array([np.std(self.prices[i - period:i]) for i in range(period, len(self.prices) + 1)])
+        ma = rolling_mean(self.prices, period)
+        std = rolling_std(self.prices, period)
         upper_band = ma + num_std * std
         lower_band = ma - num_std * std
-        return upper_band[-1], lower_band[-1]
+        return upper_band, lower_band
+
+    @memoized
+    def calculate_bollinger_bands(self, period=20, num_std=2):
+        upper_band, lower_band = self.calculate_bollinger_band_series(period, num_std)
+        return _latest(upper_band), _latest(lower_band)
 
+    @memoized
     def calculate_rsi(self, period=14):
-        if len(self.prices) < period + 1:
+        if self.prices.shape[-1] < period + 1:
             raise ValueError(f"Insufficient price data. Need at least {period + 1} prices.")
-        deltas = np.diff(self.prices)
-        seed = deltas[:period+1]
-        up = seed[seed >= 0].sum()/period
-        down = -seed[seed < 0].sum()/period
-        rs = up/down
+        deltas = np.diff(self.prices, axis=-1)
+        seed = deltas[..., :period+1]
+        up = np.where(seed >= 0, seed, 0.).sum(axis=-1)/period
+        down = -np.where(seed < 0, seed, 0.).sum(axis=-1)/period
         rsi = np.zeros_like(self.prices)
-        rsi[:period] = 100. - 100./(1. + rs)
-
-        for i in range(period, len(self.prices)):
-            delta = deltas[i-1]
-            if delta > 0:
-                upval = delta
-                downval = 0.
-            else:
-                upval = 0.
-                downval = -delta
-            up = (up*(period-1) + upval)/period
-            down = (down*(period-1) + downval)/period
-            rs = up/down
-            rsi[i] = 100. - 100./(1. + rs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi[..., :period] = (100. - 100./(1. + up/down))[..., None]
+
+            # Wilder smoothing of deltas[i-1] for i in range(period, len(prices))
+            moves = deltas[..., period-1:]
+            up = wilder_smoothing(np.maximum(moves, 0.), period, up)
+            down = wilder_smoothing(np.maximum(-moves, 0.), period, down)
+            rsi[..., period:] = 100. - 100./(1. + up/down)
         return rsi
 
+    @memoized
     def calculate_ema(self, period=8):
-        if len(self.prices) < 2 * period:
+        if self.prices.shape[-1] < 2 * period:
             raise ValueError(f"Insufficient price data. Need at least {2 * period} prices.")
         ema = np.zeros_like(self.prices)
-        ema[:period] = np.mean(self.prices[:period])
-        multiplier = 2 / (period + 1)
-        for i in range(period, len(self.prices)):
-            ema[i] = (self.prices[i] - ema[i-1]) * multiplier + ema[i-1]
+        ema[..., :period] = np.mean(self.prices[..., :period], axis=-1, keepdims=True)
+        ema[..., period:] = exponential_smoothing(self.prices[..., period:], 2 / (period + 1), ema[..., period-1])
         return ema
 
+    @memoized
     def calculate_fibonacci_levels(self, period=8):
-        if len(self.prices) < period:
+        if self.prices.shape[-1] < period:
             raise ValueError(f"Insufficient price data. Need at least {period} prices.")
-        max_price = np.max(self.prices[-period:])
-        min_price = np.min(self.prices[-period:])
+        max_price = np.max(self.prices[..., -period:], axis=-1)
+        min_price = np.min(self.prices[..., -period:], axis=-1)
         diff = max_price - min_price
         levels = [max_price - level * diff for level in [0.236, 0.382, 0.618]]
         return levels
 
+    @memoized
+    def calculate_fibonacci_level_series(self, period=8):
+        if self.prices.shape[-1] < period:
+            raise ValueError(f"Insufficient price data. Need at least {period} prices.")
+        max_price = rolling_max(self.prices, period)
+        min_price = rolling_min(self.prices, period)
+        diff = max_price - min_price
+        return tuple(max_price - level * diff for level in [0.236, 0.382, 0.618])
+
+    @memoized
     def calculate_macd(self, short=12, long=26, signal=9):
-        if len(self.prices) < long + signal:
+        if self.prices.shape[-1] < long + signal:
             raise ValueError(f"Insufficient price data. Need at least {long + signal} prices.")
         ema_short = self.calculate_ema(short)
         ema_long = self.calculate_ema(long)
         macd = ema_short - ema_long
-        signal_line = np.convolve(macd, np.ones(signal), 'valid') / signal
+        signal_line = rolling_mean(macd, signal)
         return macd, signal_line
 
-    def calculate_adx(self, period=14):
-        if len(self.prices) < 2 * period:
+    @memoized
+    def calculate_adx_series(self, period=14):
+        if self.prices.shape[-1] < 2 * period:
             raise ValueError(f"Insufficient price data. Need at least {2 * period} prices.")
-        high = np.array([max(self.prices[i-1:i+1]) for i in range(1, len(self.prices))])
-        low = np.array([min(self.prices[i-1:i+1]) for i in range(1, len(self.prices))])
-        close = self.prices[1:]
+        high = rolling_max(self.prices, 2)
+        low = rolling_min(self.prices, 2)
+        close = self.prices[..., 1:]
         
-        up = high - np.roll(high, 1)
-        down = np.roll(low, 1) - low
+        up = high - np.roll(high, 1, axis=-1)
+        down = np.roll(low, 1, axis=-1) - low
         
         plus_dm = np.where((up > down) & (up > 0), up, 0)
         minus_dm = np.where((down > up) & (down > 0), down, 0)
         
-        tr = np.maximum(high - low, np.abs(high - np.roll(close, 1)), np.abs(low - np.roll(close, 1)))
+        tr = np.maximum(high - low, np.abs(high - np.roll(close, 1, axis=-1)), np.abs(low - np.roll(close, 1, axis=-1)))
         
-        plus_di = 100 * np.convolve(plus_dm, np.ones(period), 'valid') / np.convolve(tr, np.ones(period), 'valid')
-        minus_di = 100 * np.convolve(minus_dm, np.ones(period), 'valid') / np.convolve(tr, np.ones(period), 'valid')
+        tr_sum = rolling_sum(tr, period)
+        plus_di = 100 * rolling_sum(plus_dm, period) / tr_sum
+        minus_di = 100 * rolling_sum(minus_dm, period) / tr_sum
         
         dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
-        adx = np.convolve(dx, np.ones(period), 'valid') / period
+        adx = rolling_mean(dx, period)
         
-        return adx[-1], plus_di[-1], minus_di[-1]
+        return adx, plus_di, minus_di
 
-    def calculate_stochastic(self, period=14, k_period=3, d_period=3):
-        if len(self.prices) < period + k_period + d_period:
+    @memoized
+    def calculate_adx(self, period=14):
+        adx, plus_di, minus_di = self.calculate_adx_series(period)
+        return _latest(adx), _latest(plus_di), _latest(minus_di)
+
+    @memoized
+    def calculate_stochastic_series(self, period=14, k_period=3, d_period=3):
+        if self.prices.shape[-1] < period + k_period + d_period:
             raise ValueError(f"Insufficient price data. Need at least {period + k_period + d_period} prices.")
-        low_min = np.array([np.min(self.prices[i-period:i]) for i in range(period, len(self.prices))])
-        high_max = np.array([np.max(self.prices[i-period:i]) for i in range(period, len(self.prices))])
+        # Extremes of the `period` prices preceding each bar
+        low_min = rolling_min(self.prices[..., :-1], period)
+        high_max = rolling_max(self.prices[..., :-1], period)
         
-        k_fast = 100 * (self.prices[period:] - low_min) / (high_max - low_min)
-        k = np.convolve(k_fast, np.ones(k_period), 'valid') / k_period
-        d = np.convolve(k, np.ones(d_period), 'valid') / d_period
+        k_fast = 100 * (self.prices[..., period:] - low_min) / (high_max - low_min)
+        k = rolling_mean(k_fast, k_period)
+        d = rolling_mean(k, d_period)
         
-        return k[-1]
+        return k
 
+    @memoized
+    def calculate_stochastic(self, period=14, k_period=3, d_period=3):
+        return _latest(self.calculate_stochastic_series(period, k_period, d_period))
+
+    @memoized
     def calculate_ichimoku_cloud(self, tenkan_period=9, kijun_period=26, senkou_period=52, chikou_period=26):
-        if len(self.prices) < max(tenkan_period, kijun_period, senkou_period, chikou_period):
+        if self.prices.shape[-1] < max(tenkan_period, kijun_period, senkou_period, chikou_period):
             raise ValueError(f"Insufficient price data. Need at least {max(tenkan_period, kijun_period, senkou_period, chikou_period)} prices.")
         
-        tenkan_sen = (np.max(self.prices[-tenkan_period:]) + np.min(self.prices[-tenkan_period:])) / 2
-        kijun_sen = (np.max(self.prices[-kijun_period:]) + np.min(self.prices[-kijun_period:])) / 2
+        tenkan_sen = (np.max(self.prices[..., -tenkan_period:], axis=-1) + np.min(self.prices[..., -tenkan_period:], axis=-1)) / 2
+        kijun_sen = (np.max(self.prices[..., -kijun_period:], axis=-1) + np.min(self.prices[..., -kijun_period:], axis=-1)) / 2
         senkou_span_a = (tenkan_sen + kijun_sen) / 2
-        senkou_span_b = (np.max(self.prices[-senkou_period:]) + np.min(self.prices[-senkou_period:])) / 2
+        senkou_span_b = (np.max(self.prices[..., -senkou_period:], axis=-1) + np.min(self.prices[..., -senkou_period:], axis=-1)) / 2
         
         return tenkan_sen, kijun_sen, senkou_span_a, senkou_span_b
 
+    @memoized
+    def calculate_ichimoku_cloud_series(self, tenkan_period=9, kijun_period=26, senkou_period=52, chikou_period=26):
+        if self.prices.shape[-1] < max(tenkan_period, kijun_period, senkou_period, chikou_period):
+            raise ValueError(f"Insufficient price data. Need at least {max(tenkan_period, kijun_period, senkou_period, chikou_period)} prices.")
+
+        def midpoint(period):
+            return (rolling_max(self.prices, period) + rolling_min(self.prices, period)) / 2
+
+        tenkan_sen = midpoint(tenkan_period)
+        kijun_sen = midpoint(kijun_period)
+        length = min(tenkan_sen.shape[-1], kijun_sen.shape[-1])
+        senkou_span_a = (tenkan_sen[..., -length:] + kijun_sen[..., -length:]) / 2
+        senkou_span_b = midpoint(senkou_period)
+
+        return tenkan_sen, kijun_sen, senkou_span_a, senkou_span_b
+
+    @memoized
     def analyze_volume(self, period=20):
-        volume_ma = np.mean(self.volumes[-period:])
-        current_volume = self.volumes[-1]
-        volume_change = (current_volume - volume_ma) / volume_ma * 100
-        return volume_change
+        return _latest(relative_volume(self.volumes[..., -period:], period))
 
     def identify_divergence(self, indicator, period=14):
         price_change = self.prices[-1] - self.prices[-period]
@@ -157,54 +258,29 @@ class Indicators:
         else:
             return "No divergence detected"
 
+    @memoized
     def calculate_on_balance_volume(self):
-        obv = np.zeros(len(self.prices))
-        obv[0] = self.volumes[0]
-        for i in range(1, len(self.prices)):
-            if self.prices[i] > self.prices[i-1]:
-                obv[i] = obv[i-1] + self.volumes[i]
-            elif self.prices[i] < self.prices[i-1]:
-                obv[i] = obv[i-1] - self.volumes[i]
-            else:
-                obv[i] = obv[i-1]
-        return obv
+        return on_balance_volume(self.prices, self.volumes)
 
+    @memoized
     def calculate_money_flow_index(self, period=14):
-        if len(self.prices) < period + 1 or len(self.volumes) < period + 1:
+        # MFI series from bar period + 2 on (see volume_analytics.py); None without enough data
+        if self.prices.shape[-1] < period + 3 or self.volumes.shape[-1] < period + 3:
             return None
+        return money_flow_index(self.prices, self.volumes, period)
 
-        high = np.roll(self.prices, 1)
-        low = np.roll(self.prices, 2)
-        close = self.prices
-        typical_price = (high + low + close) / 3
-
-        raw_money_flow = typical_price * self.volumes
-
-        positive_flow = np.where(typical_price > np.roll(typical_price, 1), raw_money_flow, 0)
-        negative_flow = np.where(typical_price < np.roll(typical_price, 1), raw_money_flow, 0)
-
-        positive_mf = []
-        negative_mf = []
-
-        for i in range(period, len(self.prices)):
-            positive_mf.append(np.sum(positive_flow[i-period+1:i+1]))
-            negative_mf.append(np.sum(negative_flow[i-period+1:i+1]))
-
-        positive_mf = np.array(positive_mf)
-        negative_mf = np.array(negative_mf)
-
-        mfr = np.where(negative_mf != 0, positive_mf / negative_mf, 100)  # Handle division by zero
-        mfi = 100 - (100 / (1 + mfr))
-
-        return mfi
+    @memoized
+    def calculate_vwap(self, period=None):
+        return vwap(self.prices, self.volumes, period)
 
+    @memoized
     def calculate_pivot_points(self):
-        if len(self.prices) < 2:
+        if self.prices.shape[-1] < 2:
             raise ValueError("Insufficient price data for Pivot Points calculation")
         
-        high = max(self.prices[-2:])
-        low = min(self.prices[-2:])
-        close = self.prices[-1]
+        high = np.max(self.prices[..., -2:], axis=-1)
+        low = np.min(self.prices[..., -2:], axis=-1)
+        close = self.prices[..., -1]
         
         pivot = (high + low + close) / 3
         r1 = (2 * pivot) - low
@@ -0,0 +1,175 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# In-process timers, histograms and counters for the analysis hot path. Everything
+# goes through the module-level `metrics` registry, which starts disabled: timer()
+# then hands back one shared no-op context manager and observe()/increment()
+# return straight away, so instrumented code pays for a method call and nothing else.
+#
+# Metrics export as Prometheus text (export_prometheus, or write_prometheus for the
+# node_exporter textfile collector) or as structured log lines (log_snapshot, or
+# log_observations=True for one line per observation).
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30.)
+_NULL_TIMER = nullcontext()
+
+
+def _key(name, labels):
+    # Label values are exported as text anyway; as strings they also sort together
+    # (an HTTP status code next to an exception name)
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+class Metrics:
+    def __init__(self, enabled=False, prefix='bitcoin_analyzer', buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.log_observations = False
+        self.logger = logging.getLogger('bitcoin_analyzer.metrics')
+        self._histograms = {}  # (name, labels) -> per-bucket counts (last one is +Inf), then the sum
+        self._counters = {}  # (name, labels) -> value
+        self._lock = threading.Lock()
+
+    def enable(self, log_observations=False):
+        self.enabled = True
+        self.log_observations = log_observations
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def timer(self, name, **labels):
+        # Observes the seconds spent in the block into histogram `name`
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.]
+            histogram[index] += 1
+            histogram[-1] += value
+        if self.log_observations:
+            self.logger.info(json.dumps({'metric': name, **labels, 'value': value}))
+
+    def increment(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+            counters = dict(self._counters)
+        result = {'histograms': [], 'counters': [], 'gauges': []}
+        for (name, labels), values in sorted(histograms.items()):
+            cumulative, total = [], 0
+            for count in values[:-1]:
+                total += count
+                cumulative.append(total)
+            result['histograms'].append({
+                'name': name, 'labels': dict(labels), 'count': total, 'sum': values[-1],
+                'buckets': dict(zip([*map(str, self.buckets), '+Inf'], cumulative))
+            })
+        for (name, labels), value in sorted(counters.items()):
+            result['counters'].append({'name': name, 'labels': dict(labels), 'value': value})
+        result['gauges'] = self._cache_hit_ratios(counters)
+        return result
+
+    @staticmethod
+    def _cache_hit_ratios(counters):
+        # Derived from cache_requests_total, so the cache itself only counts
+        requests = {}
+        for (name, labels), value in counters.items():
+            if name == 'cache_requests_total':
+                labels = dict(labels)
+                hits, total = requests.get(labels['endpoint'], (0, 0))
+                requests[labels['endpoint']] = (hits + (value if labels['result'] != 'miss' else 0), total + value)
+        return [{'name': 'cache_hit_ratio', 'labels': {'endpoint': endpoint}, 'value': hits / total}
+                for endpoint, (hits, total) in sorted(requests.items()) if total]
+
+    def export_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        declared = set()
+
+        def header(name, kind):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        def labelled(name, labels, extra=None):
+            pairs = {**labels, **(extra or {})}
+            if not pairs:
+                return name
+            rendered = ",".join(f'{key}="{_escape(value)}"' for key, value in pairs.items())
+            return f"{name}{{{rendered}}}"
+
+        for histogram in snapshot['histograms']:
+            name = f"{self.prefix}_{histogram['name']}"
+            header(name, 'histogram')
+            for le, count in histogram['buckets'].items():
+                lines.append(f"{labelled(name + '_bucket', histogram['labels'], {'le': le})} {count}")
+            lines.append(f"{labelled(name + '_sum', histogram['labels'])} {histogram['sum']!r}")
+            lines.append(f"{labelled(name + '_count', histogram['labels'])} {histogram['count']}")
+        for kind in ('counters', 'gauges'):
+            for metric in snapshot[kind]:
+                name = f"{self.prefix}_{metric['name']}"
+                header(name, kind[:-1])
+                lines.append(f"{labelled(name, metric['labels'])} {metric['value']!r}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Written to a temporary file and renamed, so a scraper never reads half a file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.export_prometheus())
+        os.replace(tmp_path, path)
+
+    def log_snapshot(self, logger=None):
+        logger = logger or self.logger
+        snapshot = self.snapshot()
+        for kind in ('histograms', 'counters', 'gauges'):
+            for metric in snapshot[kind]:
+                logger.info(json.dumps({'type': kind[:-1], **metric}))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
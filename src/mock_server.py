@@ -0,0 +1,372 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+import numpy as np
+import requests
+from .data_fetcher import DAY_MS, HOUR_MS, BASE_URL_ENV, DEFAULT_BASE_URL
+
+# Local stand-in for the CoinGecko endpoints DataFetcher uses, for offline runs,
+# load tests and benchmarks:
+#
+#   python -m src.mock_server --port 8000 --latency 50 --error-rate 0.01 --rate-limit 600
+#   python main.py --headless --base-url http://127.0.0.1:8000/api/v3 --rate-limit 6000
+#
+# A request is answered from a recorded fixture when one matches its path and query
+# exactly, and is otherwise generated: every coin gets a seeded daily random walk
+# with deterministic intraday noise, sampled at the granularity CoinGecko uses for
+# the span requested. With --record, requests without a fixture are forwarded to
+# --upstream instead and the real responses are saved as new fixtures.
+
+API_PREFIX = '/api/v3'
+FIVE_MINUTES_MS = 5 * 60 * 1000
+SYNTHETIC_EPOCH_MS = 1_356_998_400_000  # 2013-01-01 UTC, the first day of every synthetic walk
+CURRENCY_RATES = {'usd': 1., 'eur': 0.92, 'gbp': 0.79, 'jpy': 150.}
+
+ROUTES = [
+    (re.compile(r'/simple/price'), 'simple_price'),
+    (re.compile(r'/coins/([^/]+)/market_chart'), 'market_chart'),
+    (re.compile(r'/coins/([^/]+)/market_chart/range'), 'market_chart_range'),
+    (re.compile(r'/coins/([^/]+)/ohlc'), 'ohlc')
+]
+
+
+def _unit_noise(keys, salt):
+    # Hash of integer keys to [-1, 1): the same key always gives the same value
+    x = keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(salt)
+    x ^= x >> np.uint64(31)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(29)
+    return (x >> np.uint64(11)).astype(float) * 2. ** -52 - 1
+
+
+class SyntheticMarket:
+    # Deterministic prices for any coin at any time since SYNTHETIC_EPOCH_MS, so the
+    # same point comes back identical from market_chart, market_chart/range and ohlc.
+    # Daily closes are a seeded geometric random walk; in between, log prices are
+    # interpolated with 5-minute noise that fades to zero at each midnight.
+    def __init__(self, seed=0, volatility=0.03):
+        self.seed = seed
+        self.volatility = volatility
+        self._walks = {}  # coin_id -> (daily prices, daily volumes)
+        self._lock = threading.Lock()
+
+    def _walk(self, coin_id, days):
+        with self._lock:
+            walk = self._walks.get(coin_id)
+            if walk is None or len(walk[0]) < days:
+                # Regenerated with a year of headroom; the same seed gives the same prefix,
+                # prices and volumes each drawing from their own generator
+                key = [self.seed, zlib.crc32(coin_id.encode())]
+                price_rng = np.random.default_rng(key + [0])
+                volume_rng = np.random.default_rng(key + [1])
+                size = days + 366
+                start = 13.5 if coin_id == 'bitcoin' else price_rng.uniform(0.01, 100)
+                prices = start * np.exp(np.cumsum(price_rng.normal(0.0015, self.volatility, size)))
+                volumes = prices * volume_rng.lognormal(np.log(1e8), 0.3, size)
+                walk = self._walks[coin_id] = (prices, volumes)
+            return walk
+
+    def sample(self, coin_id, timestamps):
+        # (prices, volumes) at epoch-millisecond timestamps, which must not precede the epoch
+        elapsed = np.asarray(timestamps, dtype=np.int64) - SYNTHETIC_EPOCH_MS
+        day, fraction = np.divmod(elapsed, DAY_MS)
+        fraction = fraction / DAY_MS
+        prices, volumes = self._walk(coin_id, int(day.max(initial=0)) + 2)
+        log_prices = np.log(prices)
+        noise = _unit_noise(elapsed // FIVE_MINUTES_MS, zlib.crc32(coin_id.encode()) ^ self.seed)
+        log_price = log_prices[day] + (log_prices[day + 1] - log_prices[day]) * fraction \
+            + noise * np.sin(np.pi * fraction) * self.volatility / 4
+        volume = volumes[day] + (volumes[day + 1] - volumes[day]) * fraction
+        return np.exp(log_price), volume
+
+    @staticmethod
+    def grid(start_ms, end_ms, step_ms):
+        start_ms = max(start_ms, SYNTHETIC_EPOCH_MS)
+        return np.arange(-(-start_ms // step_ms) * step_ms, end_ms + 1, step_ms, dtype=np.int64)
+
+    @staticmethod
+    def step_for(span_ms):
+        # CoinGecko's automatic granularity
+        if span_ms <= DAY_MS:
+            return FIVE_MINUTES_MS
+        if span_ms <= 90 * DAY_MS:
+            return HOUR_MS
+        return DAY_MS
+
+    def chart(self, coin_id, timestamps, rate):
+        prices, volumes = self.sample(coin_id, timestamps)
+        timestamps = timestamps.tolist()
+        return {
+            'prices': list(map(list, zip(timestamps, (prices * rate).tolist()))),
+            'market_caps': list(map(list, zip(timestamps, (prices * rate * 2e7).tolist()))),
+            'total_volumes': list(map(list, zip(timestamps, (volumes * rate).tolist())))
+        }
+
+    def market_chart(self, coin_id, rate, days, interval=None, now_ms=None):
+        # The latest point is always the current price, as with the live API
+        now_ms = now_ms or int(time.time() * 1000)
+        span = now_ms - SYNTHETIC_EPOCH_MS if days == 'max' else int(float(days) * DAY_MS)
+        step = DAY_MS if interval == 'daily' else self.step_for(span)
+        timestamps = self.grid(now_ms - span, now_ms, step)
+        if not len(timestamps) or timestamps[-1] != now_ms:
+            timestamps = np.append(timestamps, now_ms)
+        return self.chart(coin_id, timestamps, rate)
+
+    def market_chart_range(self, coin_id, rate, start_s, end_s):
+        start_ms, end_ms = int(float(start_s) * 1000), int(float(end_s) * 1000)
+        return self.chart(coin_id, self.grid(start_ms, end_ms, self.step_for(end_ms - start_ms)), rate)
+
+    def ohlc(self, coin_id, rate, days, now_ms=None):
+        # Candles are stamped with their close time: 30 minutes wide up to 2 days,
+        # 4 hours up to 30 days, 4 days beyond that; each is built from 7 samples
+        now_ms = now_ms or int(time.time() * 1000)
+        span = now_ms - SYNTHETIC_EPOCH_MS if days == 'max' else int(float(days) * DAY_MS)
+        width = 30 * 60 * 1000 if span <= 2 * DAY_MS else 4 * HOUR_MS if span <= 30 * DAY_MS else 4 * DAY_MS
+        closes = self.grid(now_ms - span + width, now_ms, width)
+        samples = closes[:, None] - width + np.linspace(0, width, 7).astype(np.int64)
+        prices = self.sample(coin_id, samples.ravel())[0].reshape(samples.shape) * rate
+        return list(map(list, zip(closes.tolist(), prices[:, 0].tolist(), prices.max(axis=1).tolist(),
+                                  prices.min(axis=1).tolist(), prices[:, -1].tolist())))
+
+    def current_price(self, coin_id, rate, now_ms=None):
+        now_ms = now_ms or int(time.time() * 1000)
+        return float(self.sample(coin_id, [now_ms])[0][0] * rate)
+
+
+class FixtureStore:
+    # One JSON file per recorded response, named after the request path plus a hash of
+    # its query, so fixtures can be read, edited or deleted one by one
+    def __init__(self, directory):
+        self.directory = directory
+        self._fixtures = {}  # (path, query) -> (status, encoded body)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.json'):
+                with open(os.path.join(directory, name)) as f:
+                    fixture = json.load(f)
+                key = self.key(fixture['path'], fixture['params'])
+                self._fixtures[key] = (fixture['status'], json.dumps(fixture['body']).encode())
+
+    @staticmethod
+    def key(path, params):
+        return path, tuple(sorted(params.items()))
+
+    def filename(self, path, params):
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', path).strip('_')
+        digest = hashlib.sha1(json.dumps(sorted(params.items())).encode()).hexdigest()[:12]
+        return os.path.join(self.directory, f"{slug}-{digest}.json")
+
+    def __len__(self):
+        return len(self._fixtures)
+
+    def get(self, path, params):
+        return self._fixtures.get(self.key(path, params))
+
+    def save(self, path, params, status, body):
+        fixture = {'path': path, 'params': params, 'status': status, 'body': json.loads(body)}
+        filename = self.filename(path, params)
+        with open(f"{filename}.tmp", 'w') as f:
+            json.dump(fixture, f)
+        os.replace(f"{filename}.tmp", filename)
+        with self._lock:
+            self._fixtures[self.key(path, params)] = (status, body)
+
+
+class MockCoinGecko(ThreadingHTTPServer):
+    # The HTTP server itself. Faults are applied in this order: latency (a base plus
+    # uniform jitter), the per-minute rate limit, then random 500s and random 429s.
+    # Use start()/stop() or a with block to run it on a background thread.
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, market=None, fixtures=None, upstream=None, coins=None,
+                 latency=0., jitter=0., error_rate=0., throttle_rate=0., rate_limit=None, retry_after=1, seed=None):
+        super().__init__((host, port), _Handler)
+        self.market = market or SyntheticMarket()
+        self.fixtures = fixtures
+        self.upstream = upstream  # Base URL fixtures are recorded from, or None to replay only
+        self.coins = set(coins) if coins else None  # Coin ids to serve; None serves any id
+        self.latency = latency  # Seconds
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit  # Requests per minute
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.stats = Counter()  # (endpoint, status) -> responses
+        self._recent = deque()  # Monotonic times of the requests served in the last minute
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='mock-coingecko', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, path, params):
+        # (status, extra headers, encoded JSON body) for one request
+        route, match = None, None
+        for pattern, name in ROUTES:
+            match = pattern.fullmatch(path)
+            if match:
+                route = name
+                break
+        status, headers, body = self._fault()
+        if status is None:
+            status, headers, body = self._answer(route, match, path, params)
+        with self._lock:
+            self.stats[route or path, status] += 1
+        return status, headers, body
+
+    def _fault(self):
+        with self._lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            roll = self.random.random()
+        if delay:
+            time.sleep(delay)
+        if self.rate_limit:
+            now = time.monotonic()
+            with self._lock:
+                while self._recent and self._recent[0] <= now - 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit:
+                    wait = math.ceil(self._recent[0] + 60 - now)
+                    return 429, {'Retry-After': str(wait)}, _error("Rate limit exceeded")
+                self._recent.append(now)
+        if roll < self.error_rate:
+            return 500, {}, _error("Internal server error")
+        if roll < self.error_rate + self.throttle_rate:
+            return 429, {'Retry-After': str(self.retry_after)}, _error("Rate limit exceeded")
+        return None, None, None
+
+    def _answer(self, route, match, path, params):
+        recorded = self.fixtures.get(path, params) if self.fixtures is not None else None
+        if recorded is not None:
+            return recorded[0], {}, recorded[1]
+        if self.upstream:
+            return self._record(path, params)
+        if route is None:
+            return 404, {}, _error("Not found")
+        coin_id = match.group(1) if match.groups() else None
+        if coin_id is not None and self.coins is not None and coin_id not in self.coins:
+            return 404, {}, _error("coin not found")
+        try:
+            body = self._generate(route, coin_id, params)
+        except (KeyError, ValueError) as e:
+            return 400, {}, _error(f"Invalid request: {e}")
+        return 200, {}, json.dumps(body).encode()
+
+    def _generate(self, route, coin_id, params):
+        if route == 'simple_price':
+            currencies = params['vs_currencies'].lower().split(',')
+            ids = [i for i in params['ids'].lower().split(',') if self.coins is None or i in self.coins]
+            return {i: {c: self.market.current_price(i, CURRENCY_RATES.get(c, 1.)) for c in currencies} for i in ids}
+        rate = CURRENCY_RATES.get(params['vs_currency'].lower(), 1.)
+        if route == 'market_chart':
+            return self.market.market_chart(coin_id, rate, params['days'], params.get('interval'))
+        if route == 'market_chart_range':
+            return self.market.market_chart_range(coin_id, rate, params['from'], params['to'])
+        return self.market.ohlc(coin_id, rate, params['days'])
+
+    def _record(self, path, params):
+        response = requests.get(f"{self.upstream}{path}", params=params, timeout=(5, 30))
+        headers = {'Retry-After': response.headers['Retry-After']} if 'Retry-After' in response.headers else {}
+        if response.status_code == 200:
+            self.fixtures.save(path, params, 200, response.content)
+            logging.info(f"Recorded {path} {params}")
+        return response.status_code, headers, response.content
+
+
+def _error(message):
+    return json.dumps({'error': message}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so HttpClient's pooled connections are reused
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else url.path
+        status, headers, body = self.server.respond(path.rstrip('/'), dict(parse_qsl(url.query)))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the CoinGecko endpoints DataFetcher uses from local data.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--fixtures', help="Directory of recorded responses, served when a request matches one exactly.")
+    parser.add_argument('--record', action='store_true', help="Forward requests without a fixture to --upstream "
+                                                              "and save the responses into --fixtures.")
+    parser.add_argument('--upstream', default=DEFAULT_BASE_URL)
+    parser.add_argument('--coins', nargs='+', help="Coin ids to serve (default: any id).")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic prices.")
+    parser.add_argument('--latency', type=float, default=0, help="Milliseconds added to every response.")
+    parser.add_argument('--jitter', type=float, default=0, help="Up to this many more milliseconds, at random.")
+    parser.add_argument('--error-rate', type=float, default=0, help="Fraction of requests answered with a 500.")
+    parser.add_argument('--throttle-rate', type=float, default=0, help="Fraction of requests answered with a 429.")
+    parser.add_argument('--rate-limit', type=int, help="Requests per minute before answering with 429s.")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds of the random 429s.")
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.record and not args.fixtures:
+        parser.error("--record needs --fixtures")
+
+    fixtures = FixtureStore(args.fixtures) if args.fixtures else None
+    server = MockCoinGecko(args.host, args.port, SyntheticMarket(args.seed), fixtures,
+                           args.upstream if args.record else None, args.coins, args.latency / 1000,
+                           args.jitter / 1000, args.error_rate, args.throttle_rate, args.rate_limit,
+                           args.retry_after, args.seed)
+    print(f"Serving on {server.base_url} ({len(fixtures) if fixtures else 0} fixtures); "
+          f"point the analyzer at it with --base-url or {BASE_URL_ENV}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for (endpoint, status), count in sorted(server.stats.items()):
+            print(f"{endpoint:<24} {status} {count:>8}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
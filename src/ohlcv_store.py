@@ -0,0 +1,85 @@
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# On-disk columnar store for the market data DataFetcher downloads. Each table is
+# a directory with one raw little-endian binary file per column, so loading is a
+# single np.fromfile per column and appending new rows only writes the new bytes.
+# Rows are kept sorted by timestamp (epoch milliseconds).
+
+
+class ColumnTable:
+    def __init__(self, directory, fields):
+        # `fields` maps column name to dtype and must start with 'timestamp'
+        self.directory = directory
+        self.fields = {name: np.dtype(dtype).newbyteorder('<') for name, dtype in fields.items()}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    @contextmanager
+    def _locked(self, exclusive):
+        # Several analyzer processes may share one store
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self):
+        columns = {}
+        for name, dtype in self.fields.items():
+            path = self._path(name)
+            columns[name] = np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.empty(0, dtype=dtype)
+        # An interrupted write can leave columns of different lengths; trust the common prefix
+        length = min(len(column) for column in columns.values())
+        consistent = all(len(column) == length for column in columns.values())
+        return {name: column[:length] for name, column in columns.items()}, consistent
+
+    def load(self):
+        with self._locked(exclusive=False):
+            return self._read()[0]
+
+    def merge(self, columns):
+        # New rows supersede every stored row from their first timestamp onwards
+        new = {name: np.ascontiguousarray(columns[name], dtype=dtype) for name, dtype in self.fields.items()}
+        if len(new['timestamp']) == 0:
+            return
+        with self._locked(exclusive=True):
+            stored, consistent = self._read()
+            cut = np.searchsorted(stored['timestamp'], new['timestamp'][0])
+            if consistent and cut == len(stored['timestamp']):
+                for name, column in new.items():
+                    with open(self._path(name), 'ab') as f:
+                        column.tofile(f)
+                return
+            for name, column in new.items():
+                tmp_path = self._path(name) + '.tmp'
+                np.concatenate([stored[name][:cut], column]).tofile(tmp_path)
+                os.replace(tmp_path, self._path(name))
+
+    def __len__(self):
+        return len(self.load()['timestamp'])
+
+
+class OHLCVStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.series = ColumnTable(os.path.join(directory, 'market_chart'),
+                                  {'timestamp': np.int64, 'price': np.float64, 'volume': np.float64})
+        self.ohlc = ColumnTable(os.path.join(directory, 'ohlc'),
+                                {'timestamp': np.int64, 'open': np.float64, 'high': np.float64,
+                                 'low': np.float64, 'close': np.float64})
\ No newline at end of file
@@ -0,0 +1,248 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from .backtester import Backtester
+from .indicators import Indicators
+from .recommendation_engine import RecommendationEngine
+from .rolling import rolling_max, rolling_mean_windows, rolling_min, rolling_std_windows
+from .smoothing import exponential_smoothing, wilder_smoothing
+
+# Grid search over the indicator periods behind the buy/sell score, backtested the
+# way Backtester.run does it. Nothing is computed per combination: each indicator
+# is computed once for all of its own settings, as a (settings x bars) matrix (EMAs
+# of every span in one recurrence, rolling means and deviations of every window
+# from one prefix sum), and scored with RecommendationEngine.calculate_signal_components.
+# A combination's score is then the sum of one row per indicator, and chunks of
+# combinations are summed, turned into entries and simulated on a process pool.
+#
+# Every combination is scored over the same bars: those all of the grid's settings
+# (and the fixed Fibonacci, Ichimoku and ADX inputs) cover. To tune a longer
+# timeframe, sweep the closes of its resampled bars instead of the daily prices.
+
+DEFAULT_GRID = {
+    'rsi_period': (14,),
+    'ema_period': (8,),
+    'macd_short': (12,),
+    'macd_long': (26,),
+    'macd_signal': (9,),
+    'bollinger_period': (20,),
+    'bollinger_std': (2,),
+    'stochastic_period': (14,),
+    'stochastic_k': (3,),
+    'entry_threshold': (60,),
+    'profit_target': (RecommendationEngine.PROFIT_TARGET,),
+    'stop_loss': (RecommendationEngine.STOP_LOSS,)
+}
+# Metric to rank by -> whether higher is better
+METRICS = {'pnl': True, 'hit_rate': True, 'max_drawdown': False}
+
+
+def _evaluate(prices, start, components, rows, thresholds, exits, min_trades):
+    # Module level so a ProcessPoolExecutor can pickle it. rows holds one row index
+    # per indicator (in the order of components) for each signal combination; returns
+    # (combination, threshold index, exit index, pnl, hit rate, max drawdown, trades).
+    buy_signals = np.zeros((len(rows), components[0][0].shape[-1]), dtype=np.int16)
+    sell_signals = np.zeros_like(buy_signals)
+    for column, (buy, sell) in enumerate(components):
+        buy_signals += buy[rows[:, column]]
+        sell_signals += sell[rows[:, column]]
+
+    backtesters = [_CachedExitBacktester(profit_target, stop_loss) for profit_target, stop_loss in exits]
+    results = []
+    for threshold_index, threshold in enumerate(thresholds):
+        entries = Backtester.entries(buy_signals, sell_signals, threshold)
+        for combination in range(len(rows)):
+            candidates = start + np.flatnonzero(entries[combination])
+            for exit_index, backtester in enumerate(backtesters):
+                trades = backtester._simulate(prices, candidates)
+                if len(trades) < min_trades:
+                    continue
+                performance = Backtester.performance(prices, trades)
+                results.append((combination, threshold_index, exit_index, performance['pnl'],
+                                performance['hit_rate'], performance['max_drawdown'], len(trades)))
+    return results
+
+
+class _CachedExitBacktester(Backtester):
+    # A trade's exit only depends on its entry bar and the exit levels, and the
+    # combinations of a sweep enter on largely the same bars, so each is found once
+    def __init__(self, profit_target, stop_loss):
+        super().__init__(profit_target, stop_loss)
+        self._exits = {}
+
+    def _find_exit(self, prices, entry):
+        exit_found = self._exits.get(entry)
+        if exit_found is None:
+            exit_found = self._exits[entry] = super()._find_exit(prices, entry)
+        return exit_found
+
+
+class ParameterSweep:
+    def __init__(self, grid: Optional[Dict[str, Iterable[float]]] = None, metric: str = 'pnl', min_trades: int = 1,
+                 process_chunk: Optional[int] = 256, max_processes: Optional[int] = None,
+                 recommendation_engine: Optional[RecommendationEngine] = None):
+        unknown = set(grid or {}) - set(DEFAULT_GRID)
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}.")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; expected one of {', '.join(METRICS)}.")
+        self.grid = {name: tuple(dict.fromkeys((grid or {}).get(name, default)))
+                     for name, default in DEFAULT_GRID.items()}
+        self.metric = metric
+        self.min_trades = min_trades  # Combinations with fewer trades are left out of the ranking
+        self.process_chunk = process_chunk  # Signal combinations per process-pool task; None disables the pool
+        self.max_processes = max_processes
+        self.recommendation_engine = recommendation_engine or RecommendationEngine()
+        self.evaluated = 0  # Combinations backtested by the latest run
+
+    def run(self, prices, top: Optional[int] = 10) -> List[Dict[str, Any]]:
+        # The `top` best combinations (all of them for None), best first, as
+        # {'params': {...}, 'pnl', 'hit_rate', 'max_drawdown', 'trades'}
+        prices = np.asarray(prices, dtype=float)
+        start, families = self.signal_components(prices)
+        settings = [family_settings for family_settings, _ in families.values()]
+        components = [scores for _, scores in families.values()]
+        rows = np.array(list(itertools.product(*(range(len(family_settings)) for family_settings in settings))),
+                        dtype=np.intp).reshape(-1, len(settings))
+        thresholds = self.grid['entry_threshold']
+        exits = list(itertools.product(self.grid['profit_target'], self.grid['stop_loss']))
+
+        results = []
+        for offset, chunk_results in self._evaluate(prices, start, components, rows, thresholds, exits):
+            results.extend((offset + combination, *result) for combination, *result in chunk_results)
+        self.evaluated = len(rows) * len(thresholds) * len(exits)
+
+        higher_is_better = METRICS[self.metric]
+        column = 3 + list(METRICS).index(self.metric)
+        results.sort(key=lambda result: -result[column] if higher_is_better else result[column])
+        ranked = []
+        for combination, threshold_index, exit_index, pnl, hit_rate, max_drawdown, trades in results[:top]:
+            params = {}
+            for family_settings, row in zip(settings, rows[combination]):
+                params.update(family_settings[row])
+            params['entry_threshold'] = thresholds[threshold_index]
+            params['profit_target'], params['stop_loss'] = exits[exit_index]
+            ranked.append({'params': params, 'pnl': pnl, 'hit_rate': hit_rate, 'max_drawdown': max_drawdown,
+                           'trades': trades})
+        return ranked
+
+    def _evaluate(self, prices, start, components, rows, thresholds, exits):
+        # Yields (first combination, results) per chunk of signal combinations
+        if not self.process_chunk or len(rows) <= self.process_chunk:
+            yield 0, _evaluate(prices, start, components, rows, thresholds, exits, self.min_trades)
+            return
+        offsets = range(0, len(rows), self.process_chunk)
+        workers = min(len(offsets), self.max_processes or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_evaluate, prices, start, components, rows[offset:offset + self.process_chunk],
+                                       thresholds, exits, self.min_trades) for offset in offsets]
+            for offset, future in zip(offsets, futures):
+                yield offset, future.result()
+
+    def signal_components(self, prices):
+        # Returns (first scored bar, {indicator: (settings, (buy, sell))}), where
+        # settings lists the parameters behind each row of the (rows x bars) buy and
+        # sell scores; indicators that are not swept have a single row.
+        grid = self.grid
+        n = prices.shape[-1]
+        ema_periods = sorted(set(grid['ema_period'] + grid['macd_short'] + grid['macd_long']))
+        if n < 2 * ema_periods[-1]:
+            raise ValueError(f"Insufficient price data. Need at least {2 * ema_periods[-1]} prices.")
+        macd_pairs = [(short, long) for short in grid['macd_short'] for long in grid['macd_long'] if short < long]
+        if not macd_pairs:
+            raise ValueError("No MACD short period is below a long period.")
+
+        indicators = Indicators()
+        indicators.set_data(prices, np.zeros_like(prices))
+        emas = dict(zip(ema_periods, ema_matrix(prices, ema_periods)))
+        rsi = rsi_matrix(prices, grid['rsi_period'])
+        macd = np.stack([emas[short] - emas[long] for short, long in macd_pairs])
+        signal_macd = rolling_mean_windows(macd, grid['macd_signal'])
+        middle_band = rolling_mean_windows(prices, grid['bollinger_period'])
+        deviation = rolling_std_windows(prices, grid['bollinger_period'])
+        bands = np.multiply.outer(grid['bollinger_std'], deviation)
+        stochastic = stochastic_matrix(prices, grid['stochastic_period'], grid['stochastic_k'])
+        adx, plus_di, minus_di = indicators.calculate_adx_series()
+        fixed = [*indicators.calculate_fibonacci_level_series(), *indicators.calculate_ichimoku_cloud_series()[2:4],
+                 adx, plus_di, minus_di]
+
+        # As in Backtester.signal_series, every input is cut to the bars all of them
+        # cover, skipping the ADX's first bar
+        length = min(values.shape[-1] for values in [signal_macd, middle_band, stochastic, *fixed]) - 1
+        if length < 1:
+            raise ValueError("Insufficient price data for the widest settings in the grid.")
+
+        def tail(values):
+            return values[..., -length:]
+
+        def flat(values):
+            return tail(values).reshape(-1, length)
+
+        fib_0, fib_1, fib_2, span_a, span_b, adx, plus_di, minus_di = map(tail, fixed)
+        scores = self.recommendation_engine.calculate_signal_components(
+            tail(prices), flat(rsi), tail(macd)[None], tail(signal_macd), (fib_0, fib_1, fib_2), span_a, span_b,
+            flat(np.stack([emas[period] for period in grid['ema_period']])), adx, plus_di, minus_di,
+            flat(stochastic), flat(middle_band + bands), flat(middle_band - bands))
+
+        settings = {
+            'rsi': [{'rsi_period': period} for period in grid['rsi_period']],
+            'macd': [{'macd_short': short, 'macd_long': long, 'macd_signal': signal}
+                     for signal in grid['macd_signal'] for short, long in macd_pairs],
+            'ema': [{'ema_period': period} for period in grid['ema_period']],
+            'stochastic': [{'stochastic_period': period, 'stochastic_k': k}
+                           for k in grid['stochastic_k'] for period in grid['stochastic_period']],
+            'bollinger': [{'bollinger_period': period, 'bollinger_std': num_std}
+                          for num_std in grid['bollinger_std'] for period in grid['bollinger_period']]
+        }
+        families = {}
+        for name, (buy, sell) in scores.items():
+            # Small integers, so a chunk of combinations sums them cheaply
+            buy, sell = (np.asarray(values, dtype=np.int8).reshape(-1, length) for values in np.broadcast_arrays(buy, sell))
+            families[name] = (settings.get(name, [{}]), (buy, sell))
+        return n - length, families
+
+
+def ema_matrix(prices, periods):
+    # Indicators.calculate_ema for several periods, one row each, in one recurrence.
+    # Each row's smoothing runs over the whole series: before its own period the
+    # input is held at its seed (the mean of its first `period` prices), which is a
+    # fixed point of the recurrence, and the output there is the seed as in the original.
+    periods = np.asarray(periods)
+    seeds = (np.cumsum(prices)[periods - 1] / periods)[:, None]
+    warm_up = np.arange(len(prices)) < periods[:, None]
+    ema = exponential_smoothing(np.where(warm_up, seeds, prices), 2 / (periods + 1), seeds[:, 0])
+    ema[warm_up] = np.broadcast_to(seeds, ema.shape)[warm_up]
+    return ema
+
+
+def rsi_matrix(prices, periods):
+    # Indicators.calculate_rsi for several periods, held at the seed averages during
+    # each row's warm-up like ema_matrix
+    periods = np.asarray(periods)
+    deltas = np.diff(prices)
+    # The seed averages take the first period + 1 moves, as calculate_rsi does
+    up_seed = np.cumsum(np.maximum(deltas, 0.))[periods] / periods
+    down_seed = np.cumsum(np.maximum(-deltas, 0.))[periods] / periods
+    warm_up = np.arange(len(deltas)) < (periods - 1)[:, None]
+    up = wilder_smoothing(np.where(warm_up, up_seed[:, None], np.maximum(deltas, 0.)), periods, up_seed)
+    down = wilder_smoothing(np.where(warm_up, down_seed[:, None], np.maximum(-deltas, 0.)), periods, down_seed)
+    up[warm_up] = np.broadcast_to(up_seed[:, None], up.shape)[warm_up]
+    down[warm_up] = np.broadcast_to(down_seed[:, None], down.shape)[warm_up]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100. - 100. / (1. + np.concatenate([(up_seed / down_seed)[:, None], up / down], axis=-1))
+    return rsi
+
+
+def stochastic_matrix(prices, periods, k_periods):
+    # Indicators.calculate_stochastic_series for every (k period, period) pair, as a
+    # (k periods x periods x bars) array aligned with the end of prices
+    length = len(prices) - max(periods)
+    k_fast = []
+    for period in periods:
+        low_min = rolling_min(prices[:-1], period)
+        high_max = rolling_max(prices[:-1], period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k_fast.append((100 * (prices[period:] - low_min) / (high_max - low_min))[-length:])
+    return rolling_mean_windows(np.stack(k_fast), k_periods)
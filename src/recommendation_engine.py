@@ -1,44 +1,101 @@
 import numpy as np
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional
+from .dataset import as_float_array
+from .metrics import metrics
+from .resampling import BARS_PER_BUCKET, resample_positions
+from .volume_analytics import money_flow_index, volume_change
+
+# What each timeframe looks at: the daily bars its volume change, divergences and
+# MFI span, its trend view, the resampled bars (see resampling.py) its trend and
+# range are read from, and that range: the number of those bars plus the first pivot
+# level it uses for support/resistance instead of the indicator bands.
+TIMEFRAMES = {
+    'real-time': {'period': 1, 'trend': 'short-term', 'bars': None, 'range': None},
+    'daily': {'period': 1, 'trend': 'short-term', 'bars': None, 'range': None},
+    'weekly': {'period': 7, 'trend': 'weekly', 'bars': 'week', 'range': (4, 1)},
+    'monthly': {'period': 30, 'trend': 'monthly', 'bars': 'month', 'range': (3, 2)},
+}
+DEFAULT_TIMEFRAME = {'period': 1, 'trend': None, 'bars': None, 'range': None}
+BAR_RESOLUTIONS = sorted({spec['bars'] for spec in TIMEFRAMES.values() if spec['bars']})
 
 class RecommendationEngine:
+    PROFIT_TARGET = 0.1  # 10% profit target
+    STOP_LOSS = 0.05  # 5% stop loss
+
     def get_recommendation(self, price: float, rsi: List[float], macd: List[float], signal_macd: List[float], 
                         fib_levels: List[float], senkou_span_a: float, senkou_span_b: float,
                         ema: List[float], adx: float, di_plus: float, di_minus: float, stochastic: float, 
                         upper_band: float, lower_band: float, timeframe: str, historical_prices: List[float],
                         historical_volumes: List[float], pivot_points: List[float]) -> str:
-        buy_signals, sell_signals = self._calculate_signals(
-            price, rsi, macd, signal_macd, fib_levels, senkou_span_a, senkou_span_b,
-            ema, adx, di_plus, di_minus, stochastic, upper_band, lower_band
-        )
-        
-        support, resistance = self._identify_support_resistance(price, lower_band, upper_band, fib_levels, senkou_span_a, senkou_span_b, historical_prices, timeframe, pivot_points)
-        suggested_buy_price, buy_reason = self._calculate_suggested_buy_price(price, support, resistance)
-        suggested_sell_price, sell_reason = self._calculate_suggested_sell_price(price, support, resistance)
-        profit_target, profit_reason = self._calculate_profit_target(suggested_buy_price, resistance)
-        stop_loss, stop_loss_reason = self._calculate_stop_loss(suggested_buy_price, support)
-        
-        trend_analysis = self._analyze_trend(historical_prices, timeframe, adx, di_plus, di_minus)
-        
-        # Calculate period-specific indicators
-        if timeframe == "real-time" or timeframe == "daily":
-            period = 1
-        elif timeframe == "weekly":
-            period = 7
-        elif timeframe == "monthly":
-            period = 30
-        else:
-            period = 1
+        return self.get_recommendations(
+            price, rsi, macd, signal_macd, fib_levels, senkou_span_a, senkou_span_b, ema, adx, di_plus, di_minus,
+            stochastic, upper_band, lower_band, [timeframe], historical_prices, historical_volumes, pivot_points
+        )[timeframe]['recommendation']
 
-        volume_change = self._calculate_volume_change(historical_volumes, period)
-        rsi_divergence = self._identify_divergence(historical_prices, rsi, period)
-        macd_divergence = self._identify_divergence(historical_prices, macd, period)
-        mfi = self._calculate_mfi(historical_prices, historical_volumes, period)
-        
-        return self._generate_recommendation(buy_signals, sell_signals, suggested_buy_price, suggested_sell_price,
-                                            buy_reason, sell_reason, price, timeframe, support, resistance, 
-                                            trend_analysis, profit_target, profit_reason, stop_loss, stop_loss_reason,
-                                            volume_change, rsi_divergence, macd_divergence, mfi)
+    def get_recommendations(self, price: float, rsi: List[float], macd: List[float], signal_macd: List[float],
+                            fib_levels: List[float], senkou_span_a: float, senkou_span_b: float,
+                            ema: List[float], adx: float, di_plus: float, di_minus: float, stochastic: float,
+                            upper_band: float, lower_band: float, timeframes: Iterable[str],
+                            historical_prices: List[float], historical_volumes: List[float],
+                            pivot_points: List[float], bars: Optional[Dict[str, Dict[str, np.ndarray]]] = None
+                            ) -> Dict[str, Dict[str, Any]]:
+        # Every timeframe at once. The signal score, the price/volume arrays and the ADX
+        # reading are computed once; support/resistance, trend and the period-based
+        # figures once per distinct setting, so timeframes that share a setting (like
+        # real-time and daily) share the work. Returns {timeframe: details}, where
+        # details['recommendation'] is the text get_recommendation produces.
+        # `bars` maps a resolution to calendar bars of the history (DataFetcher.bars);
+        # without them the history is taken as daily and grouped from its last price.
+        with metrics.timer('recommendation_seconds', timeframe='shared'):
+            buy_signals, sell_signals = self._calculate_signals(
+                price, rsi, macd, signal_macd, fib_levels, senkou_span_a, senkou_span_b,
+                ema, adx, di_plus, di_minus, stochastic, upper_band, lower_band
+            )
+            prices = as_float_array(historical_prices)
+            volumes = as_float_array(historical_volumes)
+            adx_trend = self._analyze_adx_trend(adx, di_plus, di_minus)
+
+        bars = dict(bars or {})
+        levels, trends, period_figures, results = {}, {}, {}, {}
+        for timeframe in timeframes:
+            with metrics.timer('recommendation_seconds', timeframe=timeframe):
+                spec = TIMEFRAMES.get(timeframe, DEFAULT_TIMEFRAME)
+                resolution = spec['bars']
+                if resolution is not None and resolution not in bars:
+                    bars[resolution] = resample_positions(prices, volumes, BARS_PER_BUCKET[resolution])
+                timeframe_bars = bars.get(resolution)
+                level_key = (resolution, spec['range'])
+                if level_key not in levels:
+                    support, resistance = self._identify_support_resistance(
+                        price, lower_band, upper_band, fib_levels, senkou_span_a, senkou_span_b, timeframe_bars,
+                        spec['range'], pivot_points)
+                    suggested_buy_price, buy_reason = self._calculate_suggested_buy_price(price, support, resistance)
+                    suggested_sell_price, sell_reason = self._calculate_suggested_sell_price(price, support, resistance)
+                    profit_target, profit_reason = self._calculate_profit_target(suggested_buy_price, resistance)
+                    stop_loss, stop_loss_reason = self._calculate_stop_loss(suggested_buy_price, support)
+                    levels[level_key] = {
+                        'support': support, 'resistance': resistance,
+                        'suggested_buy_price': suggested_buy_price, 'buy_reason': buy_reason,
+                        'suggested_sell_price': suggested_sell_price, 'sell_reason': sell_reason,
+                        'profit_target': profit_target, 'profit_reason': profit_reason,
+                        'stop_loss': stop_loss, 'stop_loss_reason': stop_loss_reason
+                    }
+                if spec['trend'] not in trends:
+                    trends[spec['trend']] = self._analyze_trend(prices, spec['trend'], adx_trend, timeframe_bars)
+                period = spec['period']
+                if period not in period_figures:
+                    period_figures[period] = {
+                        'volume_change': self._calculate_volume_change(volumes, period),
+                        'rsi_divergence': self._identify_divergence(prices, rsi, period),
+                        'macd_divergence': self._identify_divergence(prices, macd, period),
+                        'mfi': self._calculate_mfi(prices, volumes, period)
+                    }
+
+                details = {'timeframe': timeframe, 'price': price, 'buy_signals': buy_signals, 'sell_signals': sell_signals,
+                           'trend_analysis': trends[spec['trend']], **levels[level_key], **period_figures[period]}
+                details['recommendation'] = self._generate_recommendation(**details)
+                results[timeframe] = details
+        return results
 
     def _calculate_signals(self, price, rsi, macd, signal_macd, fib_levels, senkou_span_a, senkou_span_b,
                            ema, adx, di_plus, di_minus, stochastic, upper_band, lower_band):
@@ -116,21 +173,57 @@ class RecommendationEngine:
         
         return buy_signals, sell_signals
 
-    def _identify_support_resistance(self, price, lower_band, upper_band, fib_levels, senkou_span_a, senkou_span_b, historical_prices, timeframe, pivot_points):
+    def calculate_signal_series(self, price, rsi, macd, signal_macd, fib_levels, senkou_span_a, senkou_span_b,
+                                ema, adx, di_plus, di_minus, stochastic, upper_band, lower_band):
+        # _calculate_signals for every bar at once: each argument is an array of
+        # per-bar values (fib_levels a sequence of three), and the scores come
+        # back as two integer arrays of the same length.
+        components = self.calculate_signal_components(
+            price, rsi, macd, signal_macd, fib_levels, senkou_span_a, senkou_span_b,
+            ema, adx, di_plus, di_minus, stochastic, upper_band, lower_band)
+        buy_signals = sum(buy for buy, _ in components.values())
+        sell_signals = sum(sell for _, sell in components.values())
+        return buy_signals, sell_signals
+
+    def calculate_signal_components(self, price, rsi, macd, signal_macd, fib_levels, senkou_span_a, senkou_span_b,
+                                    ema, adx, di_plus, di_minus, stochastic, upper_band, lower_band):
+        # The (buy, sell) points of each indicator separately. Each pair only depends on
+        # the price and that indicator's own arrays, which broadcast against the price:
+        # an indicator given as a (parameter sets x bars) matrix scores every set at once.
+        def score(conditions, points):
+            return np.select(conditions, points, 0)
+
+        return {
+            'rsi': (score([rsi < 30, rsi < 40], [2, 1]),
+                    score([rsi < 40, rsi > 70, rsi > 60], [0, 2, 1])),
+            'macd': (np.where(macd > signal_macd, 1 + (macd > 0), 0),
+                     np.where(macd > signal_macd, 0, 1 + (macd < 0))),
+            'fibonacci': (score([price < fib_levels[0], price < fib_levels[1]], [2, 1]),
+                          score([price < fib_levels[0], price < fib_levels[1], price > fib_levels[2],
+                                 price > fib_levels[1]], [0, 0, 2, 1])),
+            'ichimoku': (np.where(price > senkou_span_b, 1 + (price > senkou_span_a), 0),
+                         np.where(price > senkou_span_b, 0,
+                                  np.where(price < senkou_span_a, 1 + (price < senkou_span_b), 0))),
+            'ema': (np.where(price > ema, 1, 0), np.where(price > ema, 0, 1)),
+            'adx': (np.where((adx > 25) & (di_plus > di_minus), 2, 0),
+                    np.where((adx > 25) & ~(di_plus > di_minus), 2, 0)),
+            'stochastic': (score([stochastic < 20, stochastic < 30], [2, 1]),
+                           score([stochastic < 30, stochastic > 80, stochastic > 70], [0, 2, 1])),
+            'bollinger': (np.where(price < lower_band, 2, 0),
+                          np.where(~(price < lower_band) & (price > upper_band), 2, 0))
+        }
+
+    def _identify_support_resistance(self, price, lower_band, upper_band, fib_levels, senkou_span_a, senkou_span_b, bars, price_range, pivot_points):
         pivot, r1, s1, r2, s2, r3, s3 = pivot_points
         
-        if timeframe == "real-time" or timeframe == "daily":
+        if price_range is None:
             support_levels = [lower_band, fib_levels[0], senkou_span_a, s1, s2]
             resistance_levels = [upper_band, fib_levels[2], senkou_span_b, r1, r2]
-        elif timeframe == "weekly":
-            support_levels = [min(historical_prices[-28::7]), s1, s2]  # Last 4 weeks of data
-            resistance_levels = [max(historical_prices[-28::7]), r1, r2]
-        elif timeframe == "monthly":
-            support_levels = [min(historical_prices[-90::30]), s2, s3]  # Last 3 months of data
-            resistance_levels = [max(historical_prices[-90::30]), r2, r3]
         else:
-            support_levels = [lower_band, fib_levels[0], senkou_span_a, s1, s2]
-            resistance_levels = [upper_band, fib_levels[2], senkou_span_b, r1, r2]
+            # e.g. (4, 1): the lowest low and highest high of the last 4 bars, with S1/S2 and R1/R2
+            lookback, first_level = price_range
+            support_levels = [bars['low'][-lookback:].min(), *[s1, s2, s3][first_level-1:first_level+1]]
+            resistance_levels = [bars['high'][-lookback:].max(), *[r1, r2, r3][first_level-1:first_level+1]]
         
         support = max([level for level in support_levels if level < price], default=min(support_levels))
         resistance = min([level for level in resistance_levels if level > price], default=max(resistance_levels))
@@ -174,7 +267,7 @@ class RecommendationEngine:
         return suggested_price, reason
 
     def _calculate_profit_target(self, buy_price, resistance):
-        profit_percentage = 0.1  # 10% profit target
+        profit_percentage = self.PROFIT_TARGET
         profit_target = buy_price * (1 + profit_percentage)
         
         if profit_target > resistance:
@@ -186,7 +279,7 @@ class RecommendationEngine:
         return profit_target, reason
 
     def _calculate_stop_loss(self, buy_price, support):
-        stop_loss_percentage = 0.05  # 5% stop loss
+        stop_loss_percentage = self.STOP_LOSS
         stop_loss = buy_price * (1 - stop_loss_percentage)
         
         if stop_loss < support:
@@ -197,103 +290,80 @@ class RecommendationEngine:
         
         return stop_loss, reason
 
-    def _analyze_trend(self, historical_prices: List[float], timeframe: str, adx: float, di_plus: float, di_minus: float) -> str:
-        if timeframe == "real-time" or timeframe == "daily":
-            return self._analyze_short_term_trend(historical_prices, adx, di_plus, di_minus)
-        elif timeframe == "weekly":
-            return self._analyze_weekly_trend(historical_prices, adx, di_plus, di_minus)
-        elif timeframe == "monthly":
-            return self._analyze_monthly_trend(historical_prices, adx, di_plus, di_minus)
+    def _analyze_trend(self, historical_prices: np.ndarray, trend: str, adx_trend: str,
+                       bars: Optional[Dict[str, np.ndarray]] = None) -> str:
+        if trend == "short-term":
+            return self._analyze_short_term_trend(historical_prices) + adx_trend
+        elif trend == "weekly":
+            return self._analyze_weekly_trend(bars['close']) + adx_trend
+        elif trend == "monthly":
+            return self._analyze_monthly_trend(bars['close']) + adx_trend
         else:
             return "Unknown timeframe for trend analysis."
 
-    def _analyze_short_term_trend(self, prices: List[float], adx: float, di_plus: float, di_minus: float) -> str:
+    def _analyze_adx_trend(self, adx: float, di_plus: float, di_minus: float) -> str:
+        if adx > 25:
+            if di_plus > di_minus:
+                return " The trend is strong and bullish according to ADX."
+            else:
+                return " The trend is strong and bearish according to ADX."
+        else:
+            return " The trend is weak according to ADX."
+
+    def _analyze_short_term_trend(self, prices: np.ndarray) -> str:
         short_ma = np.mean(prices[-7:])
         long_ma = np.mean(prices[-30:])
         current_price = prices[-1]
         
-        trend = ""
         if current_price > short_ma > long_ma:
-            trend = "The short-term trend is bullish, with prices above both short and long-term moving averages."
+            return "The short-term trend is bullish, with prices above both short and long-term moving averages."
         elif current_price < short_ma < long_ma:
-            trend = "The short-term trend is bearish, with prices below both short and long-term moving averages."
+            return "The short-term trend is bearish, with prices below both short and long-term moving averages."
         elif short_ma > long_ma:
-            trend = "The short-term trend is potentially bullish, with the short-term moving average above the long-term moving average."
-        else:
-            trend = "The short-term trend is potentially bearish, with the short-term moving average below the long-term moving average."
-        
-        if adx > 25:
-            if di_plus > di_minus:
-                trend += " The trend is strong and bullish according to ADX."
-            else:
-                trend += " The trend is strong and bearish according to ADX."
+            return "The short-term trend is potentially bullish, with the short-term moving average above the long-term moving average."
         else:
-            trend += " The trend is weak according to ADX."
-        
-        return trend
+            return "The short-term trend is potentially bearish, with the short-term moving average below the long-term moving average."
+
+    def _average_return(self, closes: np.ndarray) -> float:
+        # Mean bar-to-bar return of a resampled close series
+        return np.mean(np.diff(closes) / closes[:-1])
 
-    def _analyze_weekly_trend(self, prices: List[float], adx: float, di_plus: float, di_minus: float) -> str:
-        weekly_returns = [(prices[i] - prices[i-7])/prices[i-7] for i in range(7, len(prices), 7)]
-        avg_weekly_return = np.mean(weekly_returns)
+    def _analyze_weekly_trend(self, closes: np.ndarray) -> str:
+        avg_weekly_return = self._average_return(closes)
         
-        trend = ""
         if avg_weekly_return > 0.05:
-            trend = "The weekly trend is strongly bullish, with an average weekly return above 5%."
+            return "The weekly trend is strongly bullish, with an average weekly return above 5%."
         elif avg_weekly_return > 0.02:
-            trend = "The weekly trend is moderately bullish, with an average weekly return between 2% and 5%."
+            return "The weekly trend is moderately bullish, with an average weekly return between 2% and 5%."
         elif avg_weekly_return > 0:
-            trend = "The weekly trend is slightly bullish, with a positive average weekly return."
+            return "The weekly trend is slightly bullish, with a positive average weekly return."
         elif avg_weekly_return > -0.02:
-            trend = "The weekly trend is slightly bearish, with a small negative average weekly return."
+            return "The weekly trend is slightly bearish, with a small negative average weekly return."
         elif avg_weekly_return > -0.05:
-            trend = "The weekly trend is moderately bearish, with an average weekly return between -2% and -5%."
-        else:
-            trend = "The weekly trend is strongly bearish, with an average weekly return below -5%."
-        
-        if adx > 25:
-            if di_plus > di_minus:
-                trend += " The trend is strong and bullish according to ADX."
-            else:
-                trend += " The trend is strong and bearish according to ADX."
+            return "The weekly trend is moderately bearish, with an average weekly return between -2% and -5%."
         else:
-            trend += " The trend is weak according to ADX."
-        
-        return trend
+            return "The weekly trend is strongly bearish, with an average weekly return below -5%."
 
-    def _analyze_monthly_trend(self, prices: List[float], adx: float, di_plus: float, di_minus: float) -> str:
-        monthly_returns = [(prices[i] - prices[i-30])/prices[i-30] for i in range(30, len(prices), 30)]
-        avg_monthly_return = np.mean(monthly_returns)
+    def _analyze_monthly_trend(self, closes: np.ndarray) -> str:
+        avg_monthly_return = self._average_return(closes)
         
-        trend = ""
         if avg_monthly_return > 0.15:
-            trend = "The monthly trend is strongly bullish, with an average monthly return above 15%."
+            return "The monthly trend is strongly bullish, with an average monthly return above 15%."
         elif avg_monthly_return > 0.07:
-            trend = "The monthly trend is moderately bullish, with an average monthly return between 7% and 15%."
+            return "The monthly trend is moderately bullish, with an average monthly return between 7% and 15%."
         elif avg_monthly_return > 0:
-            trend = "The monthly trend is slightly bullish, with a positive average monthly return."
+            return "The monthly trend is slightly bullish, with a positive average monthly return."
         elif avg_monthly_return > -0.07:
-            trend = "The monthly trend is slightly bearish, with a small negative average monthly return."
+            return "The monthly trend is slightly bearish, with a small negative average monthly return."
         elif avg_monthly_return > -0.15:
-            trend = "The monthly trend is moderately bearish, with an average monthly return between -7% and -15%."
-        else:
-            trend = "The monthly trend is strongly bearish, with an average monthly return below -15%."
-        
-        if adx > 25:
-            if di_plus > di_minus:
-                trend += " The trend is strong and bullish according to ADX."
-            else:
-                trend += " The trend is strong and bearish according to ADX."
+            return "The monthly trend is moderately bearish, with an average monthly return between -7% and -15%."
         else:
-            trend += " The trend is weak according to ADX."
-        
-        return trend
+            return "The monthly trend is strongly bearish, with an average monthly return below -15%."
 
-    def _calculate_volume_change(self, volumes: List[float], period: int) -> float:
+    def _calculate_volume_change(self, volumes: np.ndarray, period: int) -> float:
         if len(volumes) < period + 1:
             return 0
-        current_volume = volumes[-1]
-        previous_volume = volumes[-period-1]
-        return ((current_volume - previous_volume) / previous_volume) * 100
+        return volume_change(volumes[-period-1:], period)[-1]
 
     def _identify_divergence(self, prices: List[float], indicator: List[float], period: int) -> str:
         if len(prices) < period + 1 or len(indicator) < period + 1:
@@ -307,22 +377,18 @@ class RecommendationEngine:
         else:
             return "No divergence detected"
 
-    def _calculate_mfi(self, prices: List[float], volumes: List[float], period: int) -> float:
+    def _calculate_mfi(self, prices: np.ndarray, volumes: np.ndarray, period: int) -> float:
         if len(prices) < period + 1 or len(volumes) < period + 1:
             return 50  # Return neutral MFI if insufficient data
-        typical_prices = [(prices[i] + prices[i-1] + prices[i-2]) / 3 for i in range(2, len(prices))]
-        raw_money_flow = [tp * volumes[i+2] for i, tp in enumerate(typical_prices)]
-        positive_flow = sum(mf for mf, tp, prev_tp in zip(raw_money_flow[-period:], typical_prices[-period:], typical_prices[-period-1:]) if tp > prev_tp)
-        negative_flow = sum(mf for mf, tp, prev_tp in zip(raw_money_flow[-period:], typical_prices[-period:], typical_prices[-period-1:]) if tp < prev_tp)
-        if negative_flow == 0:
-            return 100
-        mfi = 100 - (100 / (1 + positive_flow / negative_flow))
-        return mfi
+        if len(prices) < period + 3:
+            return 100  # No bar has a previous typical price to compare with, so there is no flow
+        # Only the last period + 3 bars feed the latest value
+        return money_flow_index(prices[-period-3:], volumes[-period-3:], period)[-1]
 
     def _generate_recommendation(self, buy_signals, sell_signals, suggested_buy_price, suggested_sell_price,
                                  buy_reason, sell_reason, price, timeframe, support, resistance, 
                                  trend_analysis, profit_target, profit_reason, stop_loss, stop_loss_reason,
-                                 volume_change, rsi_divergence, macd_divergence, mfi):
+                                 volume_change, rsi_divergence, macd_divergence, mfi, **details):
         total_signals = buy_signals + sell_signals
         
         timeframe_str = "current moment" if timeframe == "real-time" else timeframe
@@ -0,0 +1,176 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+import requests
+from .http_client import HttpClient, endpoint_for
+from .metrics import metrics
+
+# Requests per minute for each CoinGecko API tier
+RATE_LIMITS = {'public': 10, 'demo': 30, 'analyst': 500, 'lite': 500, 'pro': 1000}
+
+# Lower runs first: the cheap price quote should not queue behind bulk history pulls
+PRIORITIES = {'simple/price': 0, 'ohlc': 1, 'market_chart/range': 2, 'market_chart': 2}
+DEFAULT_PRIORITY = 1
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst=None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60
+        self.capacity = burst or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+        self.paused_until = 0.
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                now = self.clock()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                self._cond.wait(wait)
+
+    def refund(self):
+        with self._cond:
+            self.tokens = min(self.capacity, self.tokens + 1)
+            self._cond.notify()
+
+    def pause(self, seconds):
+        # After a 429 nothing is sent until the server's Retry-After has passed,
+        # and the bucket restarts empty instead of bursting straight back in.
+        with self._cond:
+            now = self.clock()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0.
+            self.updated = now
+
+
+def parse_retry_after(value, default=60.):
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.)
+    except (TypeError, ValueError):
+        return default
+
+
+class RequestScheduler:
+    # Single queue in front of the API shared by every DataFetcher in the process.
+    # Requests leave in priority order as tokens become available, identical
+    # requests that are already queued or running share one Future, and a 429
+    # pauses the whole queue for Retry-After before the request is retried.
+    def __init__(self, http=None, tier='public', rate_per_minute=None, burst=None, workers=4, max_attempts=3):
+        self.http = http or HttpClient()
+        self.bucket = TokenBucket(rate_per_minute or RATE_LIMITS[tier], burst)
+        self.max_attempts = max_attempts
+        self.stats = {'requests': 0, 'deduplicated': 0, 'rate_limited': 0, 'errors': 0}
+        self._queue = []
+        self._pending = {}  # key -> Future, while queued or running
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f'request-scheduler-{i}', daemon=True).start()
+
+    @staticmethod
+    def priority_for(url):
+        for endpoint, priority in PRIORITIES.items():
+            if url.endswith(endpoint):
+                return priority
+        return DEFAULT_PRIORITY
+
+    def submit(self, url, params=None, priority=None):
+        params = dict(params or {})
+        key = (url, tuple(sorted((k, str(v)) for k, v in params.items())))
+        with self._cond:
+            future = self._pending.get(key)
+            if future is not None:
+                self.stats['deduplicated'] += 1
+                return future
+            future = self._pending[key] = Future()
+            if priority is None:
+                priority = self.priority_for(url)
+            heapq.heappush(self._queue, (priority, next(self._counter), key, url, params, 1))
+            self._cond.notify()
+        return future
+
+    def get_json(self, url, params=None, priority=None, timeout=None):
+        return self.submit(url, params, priority).result(timeout)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+            # Take the token first and only then pick the request, so whatever has the
+            # highest priority at that moment goes out next.
+            self.bucket.acquire()
+            with self._cond:
+                if not self._queue:
+                    self.bucket.refund()
+                    continue
+                priority, _, key, url, params, attempt = heapq.heappop(self._queue)
+                self.stats['requests'] += 1
+            self._execute(priority, key, url, params, attempt)
+
+    def _execute(self, priority, key, url, params, attempt):
+        try:
+            result = self.http.get_json(url, params=params)
+        except requests.HTTPError as e:
+            response = e.response
+            if response is not None and response.status_code == 429 and attempt < self.max_attempts:
+                delay = parse_retry_after(response.headers.get('Retry-After'))
+                logging.warning(f"Rate limited by {url}; pausing requests for {delay:.0f}s")
+                self.bucket.pause(delay)
+                metrics.increment('api_rate_limited_total', endpoint=endpoint_for(url))
+                with self._cond:
+                    self.stats['rate_limited'] += 1
+                    heapq.heappush(self._queue, (priority, next(self._counter), key, url, params, attempt + 1))
+                    self._cond.notify()
+                return
+            metrics.increment('api_errors_total', endpoint=endpoint_for(url),
+                              status=response.status_code if response is not None else 'none')
+            self._finish(key, error=e)
+        except Exception as e:
+            metrics.increment('api_errors_total', endpoint=endpoint_for(url), status=type(e).__name__)
+            self._finish(key, error=e)
+        else:
+            self._finish(key, result=result)
+
+    def _finish(self, key, result=None, error=None):
+        with self._cond:
+            future = self._pending.pop(key)
+            if error is not None:
+                self.stats['errors'] += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+def shared_scheduler():
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler()
+        return _shared_scheduler
\ No newline at end of file
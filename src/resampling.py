@@ -0,0 +1,109 @@
+import numpy as np
+
+# OHLCV bars from a base price series, aggregated in one vectorized pass along the
+# last axis (so an assets x time matrix on a shared time index works too). A series
+# is a dict of columns like the OHLCV store's: 'timestamp' (epoch milliseconds,
+# sorted) and 'price' or 'close', with 'open', 'high', 'low' and 'volume' used when
+# present. Buckets are a fixed width in milliseconds or one of RESOLUTIONS; bars are
+# stamped with the start of their bucket and the last one may still be forming.
+# CoinGecko volumes are 24-hour totals, so summed volumes are only true bar volumes
+# for a daily base series.
+
+DAY_MS = 24 * 60 * 60 * 1000
+# (width, origin) of the fixed-width resolutions; Unix time starts on a Thursday,
+# four days before the first Monday. Months are calendar months.
+RESOLUTIONS = {'day': (DAY_MS, 0), 'week': (7 * DAY_MS, 4 * DAY_MS), 'month': None}
+# Base bars per bucket for a daily series that has no timestamps
+BARS_PER_BUCKET = {'day': 1, 'week': 7, 'month': 30}
+
+
+def bucket_ids(timestamps, resolution, origin_ms=0):
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if resolution == 'month':
+        return timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+    width, origin = RESOLUTIONS[resolution] if isinstance(resolution, str) else (resolution, origin_ms)
+    return (timestamps - origin) // width
+
+
+def bucket_starts(ids, resolution, origin_ms=0):
+    if resolution == 'month':
+        return ids.astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+    width, origin = RESOLUTIONS[resolution] if isinstance(resolution, str) else (resolution, origin_ms)
+    return ids * width + origin
+
+
+def resample(series, resolution, origin_ms=0):
+    ids = bucket_ids(series['timestamp'], resolution, origin_ms)
+    starts = np.flatnonzero(np.diff(ids, prepend=ids[:1] - 1)) if len(ids) else np.empty(0, dtype=np.int64)
+    return _aggregate(series, starts, bucket_starts(ids[starts], resolution, origin_ms))
+
+
+def resample_positions(prices, volumes, size):
+    # Groups of `size` bars counted back from the last one, for an untimed daily
+    # series; the oldest group may be short. Bars are stamped with their first index.
+    prices = np.asarray(prices, dtype=float)
+    n = prices.shape[-1]
+    starts = np.arange(n % size, n, size)
+    if n % size:
+        starts = np.concatenate([[0], starts])
+    return _aggregate({'price': prices, 'volume': np.asarray(volumes, dtype=float)}, starts, starts)
+
+
+def _aggregate(series, starts, timestamps):
+    close = np.asarray(series['close'] if 'close' in series else series['price'], dtype=float)
+    length = close.shape[-1]
+    if not len(starts):
+        empty = close[..., :0]
+        bars = {'timestamp': np.asarray(timestamps, dtype=np.int64), 'open': empty, 'high': empty, 'low': empty,
+                'close': empty, 'count': np.empty(0, dtype=np.int64)}
+        if 'volume' in series:
+            bars['volume'] = empty
+        return bars
+    ends = np.append(starts[1:], length) - 1
+    bars = {
+        'timestamp': np.asarray(timestamps, dtype=np.int64),
+        'open': np.asarray(series.get('open', close), dtype=float)[..., starts],
+        # fmax/fmin skip the NaNs of rows that start late in a batch matrix
+        'high': np.fmax.reduceat(np.asarray(series.get('high', close), dtype=float), starts, axis=-1),
+        'low': np.fmin.reduceat(np.asarray(series.get('low', close), dtype=float), starts, axis=-1),
+        'close': close[..., ends],
+        'count': ends - starts + 1
+    }
+    if 'volume' in series:
+        bars['volume'] = np.add.reduceat(np.nan_to_num(np.asarray(series['volume'], dtype=float)), starts, axis=-1)
+    return bars
+
+
+class Resampler:
+    # Bars of one resolution kept in step with a base series that grows at its end
+    # (its last point may also be replaced, like CoinGecko's live point). Only the
+    # base points from the start of the last bar on are aggregated again; anything
+    # else, such as the window sliding forward, rebuilds the bars from scratch.
+    def __init__(self, resolution, origin_ms=0):
+        self.resolution = resolution
+        self.origin_ms = origin_ms
+        self.bars = None
+        self._series = None  # The base series the bars were last built from
+        self._first_timestamp = None
+        self._last_start = 0  # Base index of the last bar's first point
+        self._last_start_timestamp = None
+
+    def update(self, series):
+        if self.bars is not None and series is self._series:
+            return self.bars
+        timestamps = series['timestamp']
+        n = len(timestamps)
+        if (self.bars is not None and n > self._last_start and timestamps[0] == self._first_timestamp
+                and timestamps[self._last_start] == self._last_start_timestamp):
+            tail = resample({name: column[..., self._last_start:] for name, column in series.items()},
+                            self.resolution, self.origin_ms)
+            self.bars = {name: np.concatenate([column[..., :-1], tail[name]], axis=-1)
+                         for name, column in self.bars.items()}
+        else:
+            self.bars = resample(series, self.resolution, self.origin_ms)
+        self._series = series
+        if n:
+            self._first_timestamp = timestamps[0]
+            self._last_start = n - int(self.bars['count'][-1])
+            self._last_start_timestamp = timestamps[self._last_start]
+        return self.bars
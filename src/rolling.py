@@ -0,0 +1,191 @@
+import numpy as np
+
+# O(n) trailing-window statistics. Every function works along the last axis and
+# returns the 'valid' part only (length n - window + 1), like the
+# np.convolve(..., 'valid') calls these replace: out[j] covers values[j:j+window].
+# As with np.convolve, a NaN or infinity only affects the windows that contain it.
+
+_SLOPE_CHUNK = 4096
+
+
+def _check_window(values, window):
+    if window < 1:
+        raise ValueError(f"Window must be at least 1, got {window}.")
+    if values.shape[-1] < window:
+        raise ValueError(f"Insufficient data. Need at least {window} values.")
+
+
+def _flatten(blocks):
+    return blocks.reshape(blocks.shape[:-2] + (-1,))
+
+
+def _finite_mean(values):
+    # Mean along the last axis (kept) of the finite values only, 0 when there are none
+    finite = np.isfinite(values)
+    count = np.maximum(finite.sum(axis=-1, keepdims=True), 1)
+    return np.where(finite, values, 0.).sum(axis=-1, keepdims=True) / count
+
+
+def _centered(values, window):
+    # Prefix sums over data shifted by its mean keep the running totals small, so
+    # differencing them loses far less precision than summing the raw prices.
+    x = np.asarray(values, dtype=float)
+    _check_window(x, window)
+    shift = _finite_mean(x)
+    return x - shift, shift
+
+
+def _prefix_sums(values):
+    prefix = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,))
+    np.cumsum(values, axis=-1, out=prefix[..., 1:])
+    return prefix
+
+
+def _window_sums(values, window):
+    finite = np.isfinite(values)
+    if finite.all():
+        prefix = _prefix_sums(values)
+        return prefix[..., window:] - prefix[..., :-window]
+    # A NaN or infinity would carry into every later prefix sum, so the finite values
+    # are summed as usual and the others added directly to the windows holding them
+    sums = _window_sums(np.where(finite, values, 0.), window)
+    affected = _window_sums((~finite).astype(float), window) > 0
+    windows = np.lib.stride_tricks.sliding_window_view(np.where(finite, 0., values), window, axis=-1)
+    sums[affected] += windows[affected].sum(axis=-1)
+    return sums
+
+
+def _trailing_window_sums(values, windows):
+    # Sums over each of several windows (from one prefix sum when every value is
+    # finite), cut to the longest window's valid part and stacked on a new first axis
+    longest = max(windows)
+    if not np.isfinite(values).all():
+        return np.stack([_window_sums(values, window)[..., longest - window:] for window in windows])
+    prefix = _prefix_sums(values)
+    end = prefix.shape[-1]
+    return np.stack([prefix[..., longest:] - prefix[..., longest - window:end - window] for window in windows])
+
+
+def rolling_sum(values, window):
+    centered, shift = _centered(values, window)
+    return _window_sums(centered, window) + window * shift
+
+
+def rolling_mean(values, window):
+    centered, shift = _centered(values, window)
+    return _window_sums(centered, window) / window + shift
+
+
+def rolling_mean_windows(values, windows):
+    # rolling_mean for several window lengths sharing one prefix sum: row k holds
+    # windows[k], and column j the windows ending at values[j + max(windows) - 1]
+    centered, shift = _centered(values, max(windows))
+    sums = _trailing_window_sums(centered, windows)
+    return sums / np.reshape(windows, (-1,) + (1,) * centered.ndim) + shift
+
+
+def rolling_std_windows(values, windows, ddof=0):
+    # rolling_std for several window lengths, laid out like rolling_mean_windows. As
+    # in rolling_slope, the series is taken in chunks centred on their own mean, so
+    # the shared prefix sums of squares stay small wherever the price level drifts.
+    x = np.asarray(values, dtype=float)
+    longest = max(windows)
+    _check_window(x, longest)
+    sizes = np.reshape(windows, (-1,) + (1,) * x.ndim).astype(float)
+    count = x.shape[-1] - longest + 1
+    chunk = max(_SLOPE_CHUNK, longest)
+    std = np.empty((len(windows),) + x.shape[:-1] + (count,))
+    for start in range(0, count, chunk):
+        segment = x[..., start:start + chunk + longest - 1]
+        segment = segment - _finite_mean(segment)
+        sums = _trailing_window_sums(segment, windows)
+        squares = _trailing_window_sums(segment * segment, windows)
+        std[..., start:start + sums.shape[-1]] = np.sqrt(
+            np.maximum((squares - sums * sums / sizes) / (sizes - ddof), 0.))
+    return std
+
+
+def rolling_var(values, window, ddof=0):
+    # Sums of squares are taken around per-block anchors (blocks of `window`
+    # points, anchored at their mean) rather than around one global shift, so
+    # the variance of a quiet window is not swamped by the price level. Each
+    # window is the tail of one block plus the head of the next, re-anchored.
+    x = np.asarray(values, dtype=float)
+    _check_window(x, window)
+    n = x.shape[-1]
+    num_blocks = -(-n // window)
+    blocks = np.empty(x.shape[:-1] + (num_blocks * window,))
+    blocks[..., :n] = x
+    blocks[..., n:] = x[..., -1:]
+    blocks = blocks.reshape(x.shape[:-1] + (num_blocks, window))
+    anchors = _finite_mean(blocks)[..., 0]
+    deviations = blocks - anchors[..., None]
+    squared = deviations * deviations
+
+    head1 = _flatten(np.cumsum(deviations, axis=-1))
+    head2 = _flatten(np.cumsum(squared, axis=-1))
+    tail1 = _flatten(np.cumsum(deviations[..., ::-1], axis=-1)[..., ::-1])
+    tail2 = _flatten(np.cumsum(squared[..., ::-1], axis=-1)[..., ::-1])
+
+    start = np.arange(n - window + 1)
+    offset = start % window
+    block = start // window
+    shift = np.append(np.diff(anchors, axis=-1), np.zeros(x.shape[:-1] + (1,)), axis=-1)[..., block]
+    has_head = offset > 0
+    h1 = np.where(has_head, head1[..., start + window - 1], 0.)
+    h2 = np.where(has_head, head2[..., start + window - 1], 0.)
+
+    sums = tail1[..., start] + h1 + offset * shift
+    squares = tail2[..., start] + h2 + 2 * shift * h1 + offset * shift * shift
+    return np.maximum((squares - sums * sums / window) / (window - ddof), 0.)
+
+
+def rolling_std(values, window, ddof=0):
+    return np.sqrt(rolling_var(values, window, ddof))
+
+
+def _rolling_extreme(values, window, extreme, fill):
+    # van Herk / Gil-Werman: split into blocks of `window`, take running extremes
+    # forwards and backwards inside each block; any window is then covered by
+    # the backward run of one block and the forward run of the next.
+    x = np.asarray(values, dtype=float)
+    _check_window(x, window)
+    n = x.shape[-1]
+    num_blocks = -(-n // window)
+    blocks = np.full(x.shape[:-1] + (num_blocks * window,), fill)
+    blocks[..., :n] = x
+    blocks = blocks.reshape(x.shape[:-1] + (num_blocks, window))
+    forward = _flatten(extreme.accumulate(blocks, axis=-1))
+    backward = _flatten(extreme.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1])
+    count = n - window + 1
+    return extreme(backward[..., :count], forward[..., window-1:window-1+count])
+
+
+def rolling_max(values, window):
+    return _rolling_extreme(values, window, np.maximum, -np.inf)
+
+
+def rolling_min(values, window):
+    return _rolling_extreme(values, window, np.minimum, np.inf)
+
+
+def rolling_slope(values, window):
+    # Least-squares slope over each window, x counted in bars. The x-weighted sums
+    # come from prefix sums taken chunk by chunk with a local index, so the
+    # products stay small however long the series is.
+    x = np.asarray(values, dtype=float)
+    _check_window(x, window)
+    if window < 2:
+        raise ValueError("Window must be at least 2 for a slope.")
+    centered = x - _finite_mean(x)
+    count = x.shape[-1] - window + 1
+    chunk = max(_SLOPE_CHUNK, window)
+    weighted = np.empty(x.shape[:-1] + (count,))
+    for start in range(0, count, chunk):
+        segment = centered[..., start:start + chunk + window - 1]
+        index = np.arange(segment.shape[-1])
+        sums = _window_sums(segment, window)
+        moments = _window_sums(segment * index, window)
+        # sum((s + k) * y) - (s + (window - 1) / 2) * sum(y) = sum((k - mean k) * y)
+        weighted[..., start:start + sums.shape[-1]] = moments - (index[:sums.shape[-1]] + (window - 1) / 2) * sums
+    return weighted / (window * (window * window - 1) / 12)
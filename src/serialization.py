@@ -0,0 +1,23 @@
+import math
+import numpy as np
+
+# Turning analysis results into JSON, shared by the CLI's JSON output and service.py.
+# Non-finite numbers become null, since NaN and Infinity are not valid JSON.
+
+# Series that are only inputs to the analysis, left out of machine-readable output
+RAW_SERIES = ('prices', 'volumes', 'bars')
+
+
+def jsonable(value):
+    # Indicator series are reduced to their latest value, NumPy scalars to floats
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (tuple, list)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return jsonable(value[..., -1].tolist() if value.ndim else value.item())
+    if isinstance(value, np.generic):
+        return jsonable(value.item())
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
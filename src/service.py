@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Optional
+from urllib.parse import urlsplit
+from .analyzer import BitcoinAnalyzer
+from .serialization import RAW_SERIES, jsonable
+from .metrics import metrics
+
+# Serves the latest analysis as JSON to any number of dashboards:
+#
+#   GET /analysis                        everything run_analysis returns but the raw series
+#   GET /indicators[/<name>]             latest value of every (or one) indicator
+#   GET /recommendations[/<timeframe>]   recommendation text and details per timeframe
+#   GET /health, GET /metrics            service status, and metrics.py in Prometheus format
+#
+# One analysis answers every request until it is max_age seconds old. The first
+# request after that starts a refresh on the executor, so the event loop never runs
+# the fetch or the indicators, and as in TTLCache the old results are served for up
+# to stale_max_age more seconds while it runs. Requests arriving during a refresh
+# share it instead of starting their own. Each response body is encoded once per
+# data version and carries that version as its ETag.
+
+MAX_HEADER_BYTES = 16 * 1024
+
+
+class AnalysisService:
+    def __init__(self, analyzer: Optional[BitcoinAnalyzer] = None, max_age: float = 60, stale_max_age: float = 300,
+                 retry_delay: float = 5, executor=None):
+        self.analyzer = analyzer or BitcoinAnalyzer()
+        self.max_age = max_age
+        self.stale_max_age = stale_max_age
+        self.retry_delay = retry_delay  # Seconds before a failed refresh is tried again
+        # One worker is enough: refreshes never overlap, and the analyzer keeps state between runs
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='analysis-service')
+        self.results = None
+        self.version = 0  # Bumped whenever a refresh brings different data
+        self.updated = None  # Monotonic time of the last successful refresh
+        self.stats = {'requests': 0, 'refreshes': 0, 'coalesced': 0, 'failed_refreshes': 0}
+        self._data_key = None
+        self._bodies = {}  # path -> encoded body for the current version
+        self._refresh = None  # Task of the refresh in progress
+        self._retry_at = 0.
+
+    async def current(self):
+        # The results to answer with, refreshing them first only when there are none
+        # or they are too stale to serve
+        age = None if self.updated is None else time.monotonic() - self.updated
+        if age is not None and age <= self.max_age:
+            return self.results
+        refresh = self._start_refresh()
+        if refresh is not None and (age is None or age > self.max_age + self.stale_max_age):
+            # Shielded: a client hanging up must not cancel a refresh others are waiting on
+            await asyncio.shield(refresh)
+        if self.results is None:
+            raise LookupError("No analysis is available yet.")
+        return self.results
+
+    def _start_refresh(self):
+        if self._refresh is not None and not self._refresh.done():
+            self.stats['coalesced'] += 1
+            return self._refresh
+        if time.monotonic() < self._retry_at:
+            return None
+        self._refresh = asyncio.ensure_future(self._run_refresh())
+        return self._refresh
+
+    async def _run_refresh(self):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.analyzer.run_analysis)
+        except Exception:
+            logging.exception("Analysis failed")
+            results = None
+        if results is None:
+            self.stats['failed_refreshes'] += 1
+            self._retry_at = time.monotonic() + self.retry_delay
+            return
+        self.stats['refreshes'] += 1
+        data_key = (results['last_timestamp'], results['real_time_price'], results['high_price'], results['low_price'])
+        if data_key != self._data_key:
+            self._data_key = data_key
+            self.results = results
+            self.version += 1
+            self._bodies = {}
+        self.updated = time.monotonic()
+
+    def render(self, path):
+        # Encoded body of a data route; KeyError for an unknown one
+        body = self._bodies.get(path)
+        if body is None:
+            body = self._bodies[path] = json.dumps(jsonable(self._payload(path)), allow_nan=False).encode()
+        return body
+
+    def _payload(self, path):
+        results = self.results
+        parts = path.strip('/').split('/')
+        payload = {'version': self.version, 'last_timestamp': results['last_timestamp']}
+        if parts == ['analysis']:
+            payload.update((key, value) for key, value in results.items() if key not in RAW_SERIES)
+        elif parts[0] == 'indicators' and len(parts) <= 2:
+            names = parts[1:] or self.analyzer.INDICATORS
+            if any(name not in self.analyzer.INDICATORS for name in names):
+                raise KeyError(path)
+            payload['indicators'] = {name: results[name] for name in names}
+        elif parts[0] == 'recommendations' and len(parts) <= 2:
+            details = results['recommendation_details']
+            payload['recommendations'] = {timeframe: details[timeframe] for timeframe in parts[1:] or details}
+        else:
+            raise KeyError(path)
+        return payload
+
+    async def respond(self, method, target, headers):
+        # (status, content type, body, extra headers)
+        self.stats['requests'] += 1
+        path = urlsplit(target).path.rstrip('/') or '/'
+        if method not in ('GET', 'HEAD'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, 'application/json', _error("Only GET is supported"), {'Allow': 'GET, HEAD'}
+        if path == '/health':
+            age = None if self.updated is None else round(time.monotonic() - self.updated, 3)
+            body = json.dumps({'status': 'ok' if self.results is not None else 'starting', 'version': self.version,
+                               'age': age, **self.stats}).encode()
+            return HTTPStatus.OK, 'application/json', body, {}
+        if path == '/metrics':
+            return HTTPStatus.OK, 'text/plain; version=0.0.4', metrics.export_prometheus().encode(), {}
+
+        try:
+            await self.current()
+        except LookupError as e:
+            return HTTPStatus.SERVICE_UNAVAILABLE, 'application/json', _error(str(e)), {'Retry-After': str(self.retry_delay)}
+        try:
+            body = self.render(path)
+        except KeyError:
+            return HTTPStatus.NOT_FOUND, 'application/json', _error(f"Unknown resource: {path}"), {}
+        # Only a resource that exists has a version to match
+        etag = f'"{self.version}"'
+        freshness = max(0, int(self.max_age - (time.monotonic() - self.updated)))
+        cache_headers = {'ETag': etag, 'Cache-Control': f'max-age={freshness}'}
+        if headers.get('if-none-match') == etag:
+            return HTTPStatus.NOT_MODIFIED, 'application/json', b'', cache_headers
+        return HTTPStatus.OK, 'application/json', body, cache_headers
+
+    async def handle(self, reader, writer):
+        # Minimal HTTP/1.1: GET/HEAD only, keep-alive, requests answered in order
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.split(' ')
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    writer.write(_response(HTTPStatus.BAD_REQUEST, 'application/json', _error("Bad request"),
+                                           {'Connection': 'close'}))
+                    break
+                if length:
+                    await reader.readexactly(length)
+
+                status, content_type, body, extra = await self.respond(method, target, headers)
+                metrics.increment('service_requests_total', route=urlsplit(target).path.strip('/').split('/')[0],
+                                  status=int(status))
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                if not keep_alive:
+                    extra = {**extra, 'Connection': 'close'}
+                writer.write(_response(status, content_type, b'' if method == 'HEAD' else body, extra, len(body)))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        logging.info(f"Serving the analysis on http://{host}:{server.sockets[0].getsockname()[1]}")
+        return server
+
+    def run(self, host='127.0.0.1', port=8080):
+        async def main():
+            server = await self.serve(host, port)
+            # The first analysis starts right away instead of on the first request
+            self._start_refresh()
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(main())
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _error(message):
+    return json.dumps({'error': message}).encode()
+
+
+def _response(status, content_type, body, headers, length=None):
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}",
+             f"Content-Length: {len(body) if length is None else length}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body
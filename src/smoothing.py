@@ -0,0 +1,72 @@
+import numpy as np
+
+# Vectorized first-order recursions used by the EMA/RSI style indicators.
+#
+# y[i] = decay * y[i-1] + gain * x[i] is evaluated as a blocked scan: inside a
+# block of length B the recursion has the closed form d^j * cumsum(g * x_i / d^i),
+# and the value carried between blocks is itself a recursion with decay d^B that
+# is summed out to machine precision. B is picked so that 1 / d^B stays below
+# _MAX_GROWTH, which keeps the result within ~1e-10 (relative to the input scale)
+# of the sequential Python loop.
+_MAX_GROWTH = 1e3
+_MAX_BLOCK = 512
+_MAX_CARRY_TERMS = 64
+
+
+def linear_recurrence(values, decay, gain=1.0, initial=0.0):
+    # Runs along the last axis, so a (assets x time) matrix is handled in one pass.
+    # decay and gain may also hold one value per row (shape values.shape[:-1]), e.g.
+    # to run EMAs of several spans at once; the block size then follows the fastest
+    # decay and the slower rows carry their state between blocks recursively.
+    x = np.asarray(values, dtype=float)
+    decay = np.asarray(decay, dtype=float)
+    if np.any((decay < 0) | (decay >= 1)):
+        raise ValueError(f"Decay must be in [0, 1), got {decay}.")
+    n = x.shape[-1]
+    initial = np.broadcast_to(np.asarray(initial, dtype=float), x.shape[:-1])
+    if n == 0:
+        return np.zeros_like(x)
+    rows = decay.ndim > 0
+    if rows:
+        if np.any(decay == 0):
+            raise ValueError("Per-row decays must be positive.")
+        decay = np.broadcast_to(decay, x.shape[:-1])[..., None]
+        gain = np.broadcast_to(np.asarray(gain, dtype=float), x.shape[:-1])[..., None, None]
+    elif decay == 0:
+        return gain * x
+
+    block = int(min(_MAX_BLOCK, n, max(1, np.log(_MAX_GROWTH) // -np.log(decay.min()))))
+    num_blocks = -(-n // block)
+    scan = np.zeros(x.shape[:-1] + (num_blocks * block,))
+    scan[..., :n] = x
+    scan = scan.reshape(x.shape[:-1] + (num_blocks, block))
+
+    # Within a block: y[j] = d^j * (S[j] + d * carry), S[j] = cumsum(g * x[i] / d^i)
+    powers = decay ** np.arange(block + 1)
+    scan *= gain / powers[..., None, :block]
+    np.cumsum(scan, axis=-1, out=scan)
+
+    # State entering each block: carry[k] = ends[k-1] + D * carry[k-1], carry[0] = initial
+    block_decay = powers[..., block]
+    inputs = np.concatenate([initial[..., None], scan[..., :-1, -1] * powers[..., block - 1][..., None]], axis=-1)
+    terms = int(np.ceil(np.log(np.finfo(float).eps) / np.log(block_decay.max()))) if block_decay.max() > 0 else 0
+    if rows and block > 1 and terms > _MAX_CARRY_TERMS:
+        carry = np.concatenate([initial[..., None], linear_recurrence(inputs[..., 1:], block_decay, 1., initial)], axis=-1)
+    else:
+        carry = inputs.copy()
+        for m in range(1, min(terms, num_blocks - 1) + 1):
+            carry[..., m:] += block_decay[..., None] ** m * inputs[..., :-m]
+
+    scan += (decay * carry)[..., None]
+    scan *= powers[..., None, :block]
+    return scan.reshape(x.shape[:-1] + (-1,))[..., :n]
+
+
+def exponential_smoothing(values, alpha, initial):
+    # y[i] = y[i-1] + alpha * (values[i] - y[i-1]), starting from y[-1] = initial
+    return linear_recurrence(values, 1 - alpha, alpha, initial)
+
+
+def wilder_smoothing(values, period, initial):
+    # y[i] = (y[i-1] * (period - 1) + values[i]) / period, starting from y[-1] = initial
+    return linear_recurrence(values, (period - 1) / period, 1 / period, initial)
\ No newline at end of file
@@ -0,0 +1,331 @@
+import math
+from collections import deque
+from .forecasting import LinearTrendForecaster
+
+# Tick-by-tick counterpart of Indicators. Each update() folds one new price (and
+# volume) into running state in constant time, and the latest values agree with
+# what Indicators would return for the full history once every warm-up window is
+# filled. snapshot() returns plain lists/dicts (picklable and JSON friendly) that
+# restore() accepts, so live state can be parked and resumed.
+
+
+class _RollingWindow:
+    # Fixed-size window with running sum and sum of squares. The sums are taken
+    # around a reference value and rebuilt from the window every `size` pushes,
+    # which keeps the add/remove drift bounded without giving up O(1) updates.
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.reference = 0.
+        self.total = 0.
+        self.total_sq = 0.
+        self.pushes = 0
+
+    @property
+    def full(self):
+        return len(self.values) == self.size
+
+    def push(self, value):
+        if self.full:
+            old = self.values[0] - self.reference
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        new = value - self.reference
+        self.total += new
+        self.total_sq += new * new
+        self.pushes += 1
+        if self.pushes % self.size == 0:
+            self._resync()
+
+    def _resync(self):
+        self.reference = self.values[-1]
+        deviations = [v - self.reference for v in self.values]
+        self.total = sum(deviations)
+        self.total_sq = sum(d * d for d in deviations)
+
+    def sum(self):
+        return self.total + len(self.values) * self.reference
+
+    def mean(self):
+        return self.total / len(self.values) + self.reference
+
+    def std(self):
+        n = len(self.values)
+        return math.sqrt(max((self.total_sq - self.total * self.total / n) / n, 0.))
+
+    def snapshot(self):
+        return {'values': list(self.values), 'reference': self.reference, 'total': self.total,
+                'total_sq': self.total_sq, 'pushes': self.pushes}
+
+    def restore(self, state):
+        self.values = deque(state['values'], maxlen=self.size)
+        self.reference = state['reference']
+        self.total = state['total']
+        self.total_sq = state['total_sq']
+        self.pushes = state['pushes']
+
+
+class _RollingExtremes:
+    # Monotonic deques of (index, value) for the min and max of the last `size` values.
+    def __init__(self, size):
+        self.size = size
+        self.lows = deque()
+        self.highs = deque()
+        self.count = 0
+
+    @property
+    def full(self):
+        return self.count >= self.size
+
+    def push(self, value):
+        while self.lows and self.lows[-1][1] >= value:
+            self.lows.pop()
+        while self.highs and self.highs[-1][1] <= value:
+            self.highs.pop()
+        self.lows.append((self.count, value))
+        self.highs.append((self.count, value))
+        self.count += 1
+        oldest = self.count - self.size
+        if self.lows[0][0] < oldest:
+            self.lows.popleft()
+        if self.highs[0][0] < oldest:
+            self.highs.popleft()
+
+    def min(self):
+        return self.lows[0][1]
+
+    def max(self):
+        return self.highs[0][1]
+
+    def snapshot(self):
+        return {'lows': [list(item) for item in self.lows], 'highs': [list(item) for item in self.highs],
+                'count': self.count}
+
+    def restore(self, state):
+        self.lows = deque(tuple(item) for item in state['lows'])
+        self.highs = deque(tuple(item) for item in state['highs'])
+        self.count = state['count']
+
+
+class _StreamingEMA:
+    # Seeded with the mean of the first `period` values, as in Indicators.calculate_ema.
+    def __init__(self, period):
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.seed = []
+        self.value = None
+
+    def push(self, value):
+        if self.value is None:
+            self.seed.append(value)
+            if len(self.seed) == self.period:
+                self.value = sum(self.seed) / self.period
+                self.seed = []
+        else:
+            self.value = (value - self.value) * self.multiplier + self.value
+        return self.value
+
+    def snapshot(self):
+        return {'seed': list(self.seed), 'value': self.value}
+
+    def restore(self, state):
+        self.seed = list(state['seed'])
+        self.value = state['value']
+
+
+class StreamingIndicators:
+    def __init__(self, ema_period=8, rsi_period=14, macd_short=12, macd_long=26, macd_signal=9,
+                 bollinger_period=20, bollinger_std=2, stochastic_period=14, stochastic_k=3, adx_period=14,
+                 forecast_window=None):
+        self.rsi_period = rsi_period
+        self.bollinger_std = bollinger_std
+
+        self.count = 0
+        self.last_price = None
+        self.last_high = None
+        self.last_low = None
+        self.obv = None
+
+        self._ema = _StreamingEMA(ema_period)
+        self._macd_short = _StreamingEMA(macd_short)
+        self._macd_long = _StreamingEMA(macd_long)
+        self._macd_signal = _RollingWindow(macd_signal)
+        self._macd = None
+
+        # Indicators.calculate_rsi seeds from the first period + 1 deltas and then
+        # replays the last two of them through the smoothing; the same is done here.
+        self._rsi_seed = []
+        self._rsi_up = None
+        self._rsi_down = None
+
+        self._bollinger = _RollingWindow(bollinger_period)
+        self._stochastic_extremes = _RollingExtremes(stochastic_period)
+        self._stochastic_k = _RollingWindow(stochastic_k)
+
+        self._plus_dm = _RollingWindow(adx_period)
+        self._minus_dm = _RollingWindow(adx_period)
+        self._true_range = _RollingWindow(adx_period)
+        self._dx = _RollingWindow(adx_period)
+
+        # Whole history by default, like Indicators.calculate_linear_regression
+        self._trend = LinearTrendForecaster(forecast_window)
+        self._plus_di = None
+        self._minus_di = None
+
+    def update(self, price, volume=0.):
+        price = float(price)
+        volume = float(volume)
+
+        if self.last_price is None:
+            self.obv = volume
+        else:
+            delta = price - self.last_price
+            if delta > 0:
+                self.obv += volume
+            elif delta < 0:
+                self.obv -= volume
+            self._update_rsi(delta)
+            self._update_adx(price)
+
+        self._ema.push(price)
+        short = self._macd_short.push(price)
+        long = self._macd_long.push(price)
+        if long is not None:
+            self._macd = short - long
+            self._macd_signal.push(self._macd)
+
+        self._bollinger.push(price)
+        self._trend.update(price)
+
+        if self._stochastic_extremes.full:
+            low, high = self._stochastic_extremes.min(), self._stochastic_extremes.max()
+            self._stochastic_k.push(100 * (price - low) / (high - low) if high > low else math.nan)
+        self._stochastic_extremes.push(price)
+
+        self.last_price = price
+        self.count += 1
+
+    def _update_rsi(self, delta):
+        period = self.rsi_period
+        if self._rsi_up is None:
+            self._rsi_seed.append(delta)
+            if len(self._rsi_seed) < period + 1:
+                return
+            self._rsi_up = sum(d for d in self._rsi_seed if d >= 0) / period
+            self._rsi_down = -sum(d for d in self._rsi_seed if d < 0) / period
+            replay = self._rsi_seed[period-1:]
+            self._rsi_seed = []
+        else:
+            replay = [delta]
+        for d in replay:
+            self._rsi_up = (self._rsi_up * (period - 1) + max(d, 0.)) / period
+            self._rsi_down = (self._rsi_down * (period - 1) + max(-d, 0.)) / period
+
+    def _update_adx(self, price):
+        # Same construction as Indicators.calculate_adx: two-bar high/low and
+        # windowed sums of the directional movement and true range.
+        high = max(self.last_price, price)
+        low = min(self.last_price, price)
+        if self.last_high is not None:
+            up = high - self.last_high
+            down = self.last_low - low
+            self._plus_dm.push(up if up > down and up > 0 else 0.)
+            self._minus_dm.push(down if down > up and down > 0 else 0.)
+            self._true_range.push(max(high - low, abs(high - self.last_price)))
+            if self._true_range.full:
+                tr_sum = self._true_range.sum()
+                self._plus_di = 100 * self._plus_dm.sum() / tr_sum if tr_sum else math.nan
+                self._minus_di = 100 * self._minus_dm.sum() / tr_sum if tr_sum else math.nan
+                di_sum = self._plus_di + self._minus_di
+                self._dx.push(100 * abs(self._plus_di - self._minus_di) / di_sum if di_sum else math.nan)
+        self.last_high = high
+        self.last_low = low
+
+    @property
+    def ema(self):
+        return self._ema.value
+
+    @property
+    def rsi(self):
+        if self._rsi_up is None:
+            return None
+        if self._rsi_down == 0:
+            return 100. if self._rsi_up > 0 else math.nan
+        return 100. - 100. / (1. + self._rsi_up / self._rsi_down)
+
+    @property
+    def macd(self):
+        if not self._macd_signal.full:
+            return None
+        return self._macd, self._macd_signal.mean()
+
+    @property
+    def bollinger_bands(self):
+        if not self._bollinger.full:
+            return None
+        ma = self._bollinger.mean()
+        std = self._bollinger.std()
+        return ma + self.bollinger_std * std, ma - self.bollinger_std * std
+
+    @property
+    def stochastic(self):
+        if not self._stochastic_k.full:
+            return None
+        return self._stochastic_k.mean()
+
+    @property
+    def adx(self):
+        if not self._dx.full:
+            return None
+        return self._dx.mean(), self._plus_di, self._minus_di
+
+    @property
+    def predicted_price(self):
+        # Same point as Indicators.calculate_linear_regression(days_ahead=1)
+        return self._trend.predict(2)
+
+    def values(self):
+        return {
+            'ema': self.ema,
+            'rsi': self.rsi,
+            'macd': self.macd,
+            'bollinger_bands': self.bollinger_bands,
+            'stochastic': self.stochastic,
+            'adx': self.adx,
+            'predicted_price': self.predicted_price,
+            'obv': self.obv
+        }
+
+    def _components(self):
+        return {
+            'ema': self._ema, 'macd_short': self._macd_short, 'macd_long': self._macd_long,
+            'macd_signal': self._macd_signal, 'bollinger': self._bollinger,
+            'stochastic_extremes': self._stochastic_extremes, 'stochastic_k': self._stochastic_k,
+            'plus_dm': self._plus_dm, 'minus_dm': self._minus_dm, 'true_range': self._true_range, 'dx': self._dx,
+            'trend': self._trend
+        }
+
+    def snapshot(self):
+        state = {name: component.snapshot() for name, component in self._components().items()}
+        state.update({
+            'count': self.count, 'last_price': self.last_price, 'last_high': self.last_high,
+            'last_low': self.last_low, 'obv': self.obv, 'macd': self._macd, 'rsi_seed': list(self._rsi_seed),
+            'rsi_up': self._rsi_up, 'rsi_down': self._rsi_down, 'plus_di': self._plus_di, 'minus_di': self._minus_di
+        })
+        return state
+
+    def restore(self, state):
+        for name, component in self._components().items():
+            component.restore(state[name])
+        self.count = state['count']
+        self.last_price = state['last_price']
+        self.last_high = state['last_high']
+        self.last_low = state['last_low']
+        self.obv = state['obv']
+        self._macd = state['macd']
+        self._rsi_seed = list(state['rsi_seed'])
+        self._rsi_up = state['rsi_up']
+        self._rsi_down = state['rsi_down']
+        self._plus_di = state['plus_di']
+        self._minus_di = state['minus_di']
\ No newline at end of file
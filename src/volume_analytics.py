@@ -0,0 +1,88 @@
+import numpy as np
+from .rolling import rolling_mean
+
+# Volume indicators over whole histories, each a handful of whole-array passes
+# (signs, cumulative sums, window differences) along the last axis, so an (assets x
+# time) matrix works too. Series come back aligned with the end of the input like
+# the rolling.py functions: element -k belongs to bar -k.
+
+
+def on_balance_volume(prices, volumes):
+    # Running total of the volume of up bars minus that of down bars, starting from
+    # the first bar's volume
+    prices = np.asarray(prices, dtype=float)
+    volumes = np.asarray(volumes, dtype=float)
+    obv = np.empty(np.broadcast_shapes(prices.shape, volumes.shape))
+    if not obv.shape[-1]:
+        return obv
+    obv[..., 0] = volumes[..., 0]
+    np.subtract(prices[..., 1:], prices[..., :-1], out=obv[..., 1:])
+    np.sign(obv[..., 1:], out=obv[..., 1:])
+    obv[..., 1:] *= volumes[..., 1:]
+    return np.cumsum(obv, axis=-1, out=obv)
+
+
+def typical_prices(prices):
+    # Closes are the only prices available, so a bar's typical price is the mean of
+    # its close and the two before it (the first two bars have none)
+    prices = np.asarray(prices, dtype=float)
+    return (prices[..., 2:] + prices[..., 1:-1] + prices[..., :-2]) / 3
+
+
+def _window_totals(values, window):
+    # Trailing-window sums as differences of a plain running total: the values here
+    # are never negative, so a window of zeros comes out as exactly zero
+    totals = np.cumsum(values, axis=-1)
+    sums = totals[..., window - 1:].copy()
+    sums[..., 1:] -= totals[..., :-window]
+    return sums
+
+
+def money_flow_index(prices, volumes, period=14):
+    # MFI of every bar from index period + 2 on: the share of the last `period` bars'
+    # money flow (typical price x volume) that came on bars whose typical price rose,
+    # scaled to 0..100; 100 when no flow came on falling bars.
+    prices = np.asarray(prices, dtype=float)
+    volumes = np.asarray(volumes, dtype=float)
+    if prices.shape[-1] < period + 3:
+        raise ValueError(f"Insufficient price data. Need at least {period + 3} prices.")
+    typical = typical_prices(prices)
+    flows = typical[..., 1:] * volumes[..., 3:]
+    rising = typical[..., 1:] > typical[..., :-1]
+    falling = typical[..., 1:] < typical[..., :-1]
+    positive = _window_totals(np.where(rising, flows, 0.), period)
+    negative = _window_totals(np.where(falling, flows, 0.), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(negative == 0, 100., 100 - 100 / (1 + positive / negative))
+
+
+def volume_change(volumes, period=1):
+    # Percentage change of the volume over `period` bars, for every bar from index
+    # period on
+    volumes = np.asarray(volumes, dtype=float)
+    if volumes.shape[-1] < period + 1:
+        raise ValueError(f"Insufficient volume data. Need at least {period + 1} volumes.")
+    previous = volumes[..., :-period]
+    return (volumes[..., period:] - previous) / previous * 100
+
+
+def relative_volume(volumes, period=20):
+    # Percentage by which each bar's volume differs from the mean of the `period`
+    # bars ending with it
+    volumes = np.asarray(volumes, dtype=float)
+    volume_ma = rolling_mean(volumes, period)
+    return (volumes[..., period - 1:] - volume_ma) / volume_ma * 100
+
+
+def vwap(prices, volumes, period=None):
+    # Volume-weighted average price of the `period` bars ending at each bar, or of
+    # every bar so far when period is None
+    prices = np.asarray(prices, dtype=float)
+    volumes = np.asarray(volumes, dtype=float)
+    if period is None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.cumsum(prices * volumes, axis=-1) / np.cumsum(volumes, axis=-1)
+    if prices.shape[-1] < period:
+        raise ValueError(f"Insufficient price data. Need at least {period} prices.")
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _window_totals(prices * volumes, period) / _window_totals(volumes, period)
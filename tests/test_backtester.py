@@ -0,0 +1,29 @@
+import numpy as np
+from src.backtester import Backtester
+
+
+class FinalBarSignals(Backtester):
+    # Every bar scores as a strong buy, so the last bar is an entry candidate too
+    def signal_series(self, prices, volumes=None):
+        return 0, np.full(len(prices), 10), np.zeros(len(prices), dtype=int)
+
+
+def test_entry_signal_on_final_bar():
+    # The first trade hits its profit target on the last bar, which signals again
+    prices = np.array([100., 101., 102., 103., 111.])
+    result = FinalBarSignals().run(prices)
+    assert [(trade['entry_index'], trade['exit_index']) for trade in result['trades']] == [(0, 4)]
+    assert np.isclose(result['pnl'], 0.11)
+
+
+def test_single_bar_history():
+    result = FinalBarSignals().run(np.array([100.]))
+    assert result['trades'] == []
+    assert result['pnl'] == 0.
+
+
+def test_performance_ignores_trade_without_following_bar():
+    prices = np.array([100., 105., 110.])
+    performance = Backtester.performance(prices, [(2, 2, 'end of data')])
+    assert performance['pnl'] == 0.
+    assert performance['max_drawdown'] == 0.
@@ -0,0 +1,36 @@
+from src import cli
+
+
+class FlakyAnalyzer:
+    # Fails on the first run only
+    def __init__(self):
+        self.runs = 0
+        self.closed = False
+
+    def run_analysis(self):
+        self.runs += 1
+        if self.runs == 1:
+            raise ConnectionError("network down")
+        return {'last_timestamp': 1, 'real_time_price': 100.}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+
+def run(monkeypatch, argv):
+    analyzer = FlakyAnalyzer()
+    monkeypatch.setattr(cli, 'build_analyzer', lambda args: analyzer)
+    status = cli.main(['--headless', '--format', 'json', *argv])
+    assert analyzer.closed
+    return status
+
+
+def test_periodic_run_with_a_failure_exits_non_zero(monkeypatch):
+    assert run(monkeypatch, ['--interval', '0.01', '--count', '2']) == 1
+
+
+def test_single_failed_run_exits_non_zero(monkeypatch):
+    assert run(monkeypatch, []) == 1
@@ -0,0 +1,33 @@
+import numpy as np
+from src.analyzer import BitcoinAnalyzer
+from src.data_fetcher import DataFetcher
+from src.dataset import OHLCVDataset
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def series(start, count):
+    days = np.arange(start, start + count)
+    return OHLCVDataset(days * DAY_MS, 100. + days, volume=1e9 + days)
+
+
+def test_results_keep_their_values_across_refreshes():
+    fetcher = DataFetcher(store_dir=None)
+    fetcher._set_series(series(0, 400))
+    with BitcoinAnalyzer(fetcher) as analyzer:
+        analyzer.indicators.set_data(fetcher.prices, fetcher.volumes)
+        results = analyzer._calculate_indicators(100.)
+    prices, volumes = results['prices'].copy(), results['volumes'].copy()
+    for start in range(1, 40):
+        fetcher._set_series(series(start, 400))
+    assert np.array_equal(results['prices'], prices)
+    assert np.array_equal(results['volumes'], volumes)
+
+
+def test_volumes_off_the_price_grid_carry_forward():
+    data = {'prices': [[1000, 10.], [2000, 11.], [3000, 12.], [4000, 13.]],
+            'total_volumes': [[1500, 5.], [3000, 7.]]}
+    decoded = DataFetcher._decode_chart_arrays(data)
+    assert decoded['volume'].tolist() == [5., 5., 7., 7.]
+    assert DataFetcher._decode_chart_arrays({'prices': data['prices'], 'total_volumes': []})['volume'].tolist() == \
+        [0., 0., 0., 0.]
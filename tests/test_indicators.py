@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.analyzer import BitcoinAnalyzer
+from src.data_fetcher import DataFetcher
+from src.indicators import Indicators
+
+
+def indicators(n=60):
+    prices = 100 + np.cumsum(np.random.default_rng(0).normal(size=n))
+    result = Indicators()
+    result.set_data(prices, np.ones(n))
+    return result
+
+
+def test_cached_lists_are_not_shared():
+    data = indicators()
+    for method in (data.calculate_fibonacci_levels, data.calculate_pivot_points):
+        first = method()
+        expected = list(first)
+        first.append(None)
+        first[0] = None
+        assert method() == expected
+
+
+def test_unhashable_arguments_bypass_the_cache():
+    data = indicators()
+    forecasts = data.calculate_linear_regression([1, 5])
+    assert np.allclose(forecasts, data.calculate_linear_regression((1, 5)))
+
+
+def test_latest_values_are_scalars_for_a_single_series():
+    data = indicators(100)
+    values = [*data.calculate_bollinger_bands(), *data.calculate_adx(), data.calculate_stochastic()]
+    assert all(isinstance(value, np.float64) for value in values)
+
+
+def test_latest_values_are_arrays_for_a_matrix():
+    prices = indicators(100).prices
+    data = Indicators()
+    data.set_data(np.vstack([prices, prices * 2]), np.ones((2, 100)))
+    values = [*data.calculate_bollinger_bands(), *data.calculate_adx(), data.calculate_stochastic()]
+    assert all(value.shape == (2,) for value in values)
+
+
+def test_concurrent_calls_share_one_cached_result():
+    data = indicators(500)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: data.calculate_ema(12), range(32)))
+    assert all(result is results[0] for result in results)
+
+
+def test_analyzer_close_stops_graph_threads():
+    data = indicators(200)
+    analyzer = BitcoinAnalyzer(DataFetcher(store_dir=None))
+    analyzer.indicators.set_data(data.prices, data.volumes)
+    with analyzer:
+        analyzer.indicator_graph.compute(['rsi', 'macd'])
+        assert any(thread.name.startswith('indicators') for thread in threading.enumerate())
+    assert not any(thread.name.startswith(('indicators', 'data-fetcher')) for thread in threading.enumerate())
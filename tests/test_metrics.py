@@ -0,0 +1,13 @@
+from src.metrics import Metrics
+
+
+def test_int_and_str_label_values_export_together():
+    metrics = Metrics(enabled=True)
+    metrics.increment('api_errors_total', endpoint='simple/price', status=500)
+    metrics.increment('api_errors_total', endpoint='simple/price', status='ConnectionError')
+    metrics.observe('fetch_seconds', 0.1, attempt=1)
+    metrics.observe('fetch_seconds', 0.2, attempt='last')
+    counters = metrics.snapshot()['counters']
+    assert [counter['labels']['status'] for counter in counters] == ['500', 'ConnectionError']
+    text = metrics.export_prometheus()
+    assert 'status="500"' in text and 'status="ConnectionError"' in text
@@ -0,0 +1,10 @@
+import numpy as np
+from src.mock_server import SyntheticMarket
+
+
+def test_longer_walk_keeps_the_prefix():
+    for coin_id in ('bitcoin', 'ethereum'):
+        short = SyntheticMarket(seed=3)._walk(coin_id, 10)
+        long = SyntheticMarket(seed=3)._walk(coin_id, 1000)
+        for short_series, long_series in zip(short, long):
+            assert np.array_equal(short_series, long_series[:len(short_series)])
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from src.backtester import Backtester
+from src.parameter_sweep import ParameterSweep
+
+
+def random_walk(size, seed):
+    rng = np.random.default_rng(seed)
+    return 30000 * np.exp(np.cumsum(rng.normal(0, 0.03, size)))
+
+
+def test_default_grid_matches_backtester():
+    prices = random_walk(400, 1)
+    expected = Backtester().run(prices)
+    [best] = ParameterSweep().run(prices)
+    assert best['pnl'] == expected['pnl']
+    assert best['trades'] == len(expected['trades'])
+
+
+def test_sweeps_survive_final_bar_signals():
+    # Series whose last bar scores as an entry used to abort the sweep
+    for seed in range(60):
+        ParameterSweep().run(random_walk(80 + seed * 5, seed))
+
+
+def test_errors_in_a_backtest_propagate(monkeypatch):
+    def fail(prices, trades):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(Backtester, 'performance', staticmethod(fail))
+    with pytest.raises(RuntimeError, match="boom"):
+        ParameterSweep(min_trades=0, process_chunk=None).run(random_walk(400, 1))
@@ -0,0 +1,20 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.rolling import rolling_mean, rolling_mean_windows, rolling_std, rolling_std_windows, rolling_sum
+
+
+def test_nan_only_affects_windows_containing_it():
+    values = np.array([1., 2., np.nan, 4., 5., 6., 7., 8.])
+    expected = np.array([1.5, np.nan, np.nan, 4.5, 5.5, 6.5, 7.5])
+    assert np.allclose(rolling_mean(values, 2), expected, equal_nan=True)
+    assert np.allclose(rolling_sum(values, 2), 2 * expected, equal_nan=True)
+    assert np.allclose(rolling_mean_windows(values, (1, 2))[1], expected, equal_nan=True)
+
+
+def test_std_with_embedded_nan_matches_numpy():
+    values = 100 + np.cumsum(np.random.default_rng(0).normal(size=80))
+    values[[15, 41]] = np.nan
+    expected = sliding_window_view(values, 10).std(axis=-1)
+    assert np.allclose(rolling_std(values, 10), expected, equal_nan=True)
+    assert np.allclose(rolling_std_windows(values, (5, 10))[1], expected, equal_nan=True)
+    assert np.isfinite(rolling_std(values, 10)[:5]).all()
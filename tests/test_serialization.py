@@ -0,0 +1,10 @@
+import json
+import numpy as np
+from src.serialization import jsonable
+
+
+def test_non_finite_numpy_values_become_null():
+    value = {'a': np.float64('nan'), 'b': float('nan'), 'c': [np.float32('inf')], 'd': np.array([1., np.nan]),
+             'e': np.array(-np.inf), 'f': np.float64(2.5)}
+    assert json.dumps(jsonable(value), allow_nan=False) == \
+        '{"a": null, "b": null, "c": [null], "d": null, "e": null, "f": 2.5}'
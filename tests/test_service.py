@@ -0,0 +1,31 @@
+import asyncio
+from http import HTTPStatus
+from src.service import AnalysisService
+
+
+class StubAnalyzer:
+    INDICATORS = ('rsi',)
+
+    def run_analysis(self):
+        return {'last_timestamp': 1, 'real_time_price': 100., 'high_price': 110., 'low_price': 90., 'rsi': 55.,
+                'recommendation_details': {'short_term': {'recommendation': 'Hold'}}}
+
+
+def respond(service, path, headers=None):
+    return asyncio.run(service.respond('GET', path, headers or {}))
+
+
+def test_unknown_path_is_not_found_despite_matching_etag():
+    service = AnalysisService(StubAnalyzer())
+    status, _, _, extra = respond(service, '/indicators')
+    assert status == HTTPStatus.OK
+    status, _, _, _ = respond(service, '/nothing-here', {'if-none-match': extra['ETag']})
+    assert status == HTTPStatus.NOT_FOUND
+
+
+def test_known_path_with_matching_etag_is_not_modified():
+    service = AnalysisService(StubAnalyzer())
+    _, _, _, extra = respond(service, '/indicators/rsi')
+    status, _, body, _ = respond(service, '/indicators/rsi', {'if-none-match': extra['ETag']})
+    assert status == HTTPStatus.NOT_MODIFIED
+    assert body == b''